@@ -3,16 +3,21 @@ Flask REST API for Food Tracker Web Application.
 Provides endpoints for all food tracking operations.
 """
 
+import calendar
 import sys
 from pathlib import Path
 
+ROOT_DIR = Path(__file__).parent.parent
+
 # Add parent directory to path to import existing modules
-sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(ROOT_DIR))
 
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, g, request
+from flask_compress import Compress
 from flask_cors import CORS
 from datetime import datetime, date, timedelta
-import json
+import orjson
+from whitenoise import WhiteNoise
 
 import database as db
 import logic
@@ -22,52 +27,150 @@ app = Flask(__name__,
             template_folder='../templates')
 CORS(app)
 
+# Compress text responses over 1 KB; images and other binary assets are
+# already compressed and are left alone. Flask-Compress adds
+# Vary: Accept-Encoding so cached copies are keyed per encoding.
+# It suffixes the ETag with the encoding, so it must re-run the conditional
+# check itself for If-None-Match to produce a 304; streamed responses such
+# as /api/export are compressed chunk by chunk instead of being buffered.
+app.config.update(
+    COMPRESS_MIMETYPES=['application/json', 'text/html', 'text/css',
+                        'text/javascript', 'application/javascript'],
+    COMPRESS_ALGORITHM=['br', 'gzip'],
+    COMPRESS_LEVEL=4,
+    COMPRESS_BR_LEVEL=4,
+    COMPRESS_MIN_SIZE=1024,
+    COMPRESS_EVALUATE_CONDITIONAL_REQUEST=True,
+    COMPRESS_STREAMS=True,
+)
+Compress(app)
+
 # Initialize database on startup
 db.init_database()
 
 
 # ============== Helper Functions ==============
 
+ONE_DAY = timedelta(days=1)
+
+
+def today():
+    """Get today's date, computed once per request."""
+    if 'today' not in g:
+        g.today = date.today()
+    return g.today
+
+
 def parse_date(date_str):
     """Parse date string to date object."""
     if not date_str or date_str == 'today':
-        return date.today()
+        return today()
     if date_str == 'yesterday':
-        return date.today() - timedelta(days=1)
+        return today() - ONE_DAY
+    try:
+        return date.fromisoformat(date_str)
+    except ValueError:
+        pass
+    # strptime also accepts dates without zero padding, e.g. 2024-1-5
     try:
         return datetime.strptime(date_str, '%Y-%m-%d').date()
     except ValueError:
         return None
 
 
+def now():
+    """Get the current time, computed once per request."""
+    if 'now' not in g:
+        g.now = datetime.now()
+    return g.now
+
+
+def resolve_logged_at(data):
+    """Get the log timestamp from a request body.
+
+    Uses 'logged_at' if given, otherwise 'date' at the current time of day.
+    Returns None if neither is given so the database default applies.
+    """
+    if data.get('logged_at'):
+        return datetime.fromisoformat(data['logged_at'])
+    if data.get('date'):
+        log_date = parse_date(data['date'])
+        if log_date:
+            return datetime.combine(log_date, now().time())
+    return None
+
+
+def get_json_body():
+    """Parse the request body as JSON. Returns None if empty or invalid."""
+    body = request.get_data(cache=False)
+    if not body:
+        return None
+    try:
+        return orjson.loads(body)
+    except orjson.JSONDecodeError:
+        return None
+
+
 def json_response(data, status=200):
-    """Create a JSON response."""
-    return jsonify(data), status
+    """Create a JSON response.
+
+    Successful GET responses carry an ETag so clients can revalidate
+    with If-None-Match and get a bodyless 304 when nothing changed.
+    """
+    response = Response(orjson.dumps(data), status=status, mimetype='application/json')
+    if request.method == 'GET' and status == 200:
+        response.add_etag()
+        response.cache_control.no_cache = True
+        response = response.make_conditional(request)
+    return response
 
 
 def error_response(message, status=400):
     """Create an error response."""
-    return jsonify({'error': message}), status
+    return json_response({'error': message}, status)
+
+
+# Optional request body fields and their defaults
+FOOD_FIELDS = {'calories': 0, 'protein': 0, 'carbs': 0, 'fats': 0, 'serving_size': '1 serving'}
+FOOD_UPDATE_FIELDS = dict.fromkeys(('name', *FOOD_FIELDS))
+MEAL_LOG_FIELDS = {'portions': 1.0, 'meal_type': 'snack', 'notes': None}
+
+
+def pick_fields(data, fields):
+    """Pull the known fields out of a request body, filling in defaults."""
+    return {key: data.get(key, default) for key, default in fields.items()}
 
 
 # ============== Static Files & PWA ==============
 
-@app.route('/')
-def index():
-    """Serve the main HTML page."""
-    return send_from_directory('../templates', 'index.html')
+# Files that must always be revalidated: the page shell and the service
+# worker, which browsers need to see updates to straight away
+REVALIDATE_URLS = ('/', '/sw.js')
+MANIFEST_MAX_AGE = 86400
 
 
-@app.route('/manifest.json')
-def manifest():
-    """Serve PWA manifest."""
-    return send_from_directory('../static', 'manifest.json')
+def static_cache_headers(headers, path, url):
+    """Set per-file Cache-Control for files served by WhiteNoise."""
+    if url in REVALIDATE_URLS:
+        headers['Cache-Control'] = 'no-cache'
+    elif url == '/manifest.json':
+        headers['Cache-Control'] = f'public, max-age={MANIFEST_MAX_AGE}'
 
 
-@app.route('/sw.js')
-def service_worker():
-    """Serve service worker from root."""
-    return send_from_directory('../static/js', 'sw.js')
+# WhiteNoise answers static requests before they reach Flask, with cached
+# file metadata and proper Cache-Control headers. The service worker and
+# manifest live at the site root so their scope covers the whole app.
+# Every file carries an ETag and Last-Modified, so revalidation is a 304.
+# Asset filenames are not content-hashed, so they are revalidated on every
+# load (max_age=0) to keep the JS/CSS in step with the HTML after a deploy.
+# These responses never pass through Flask-Compress; WhiteNoise sends the
+# .br/.gz siblings that `python -m whitenoise.compress` writes at build time.
+app.wsgi_app = WhiteNoise(app.wsgi_app, root=ROOT_DIR / 'static', prefix='static/',
+                          index_file=True, max_age=0,
+                          add_headers_function=static_cache_headers)
+app.wsgi_app.add_files(ROOT_DIR / 'templates', prefix='/')
+app.wsgi_app.add_file_to_dictionary('/manifest.json', str(ROOT_DIR / 'static' / 'manifest.json'))
+app.wsgi_app.add_file_to_dictionary('/sw.js', str(ROOT_DIR / 'static' / 'js' / 'sw.js'))
 
 
 # ============== Food Endpoints ==============
@@ -98,20 +201,13 @@ def get_food(food_id):
 @app.route('/api/foods', methods=['POST'])
 def add_food():
     """Add a new food."""
-    data = request.get_json()
+    data = get_json_body()
 
     if not data or not data.get('name'):
         return error_response('Food name is required')
 
     try:
-        food_id = db.add_food(
-            name=data['name'],
-            calories=data.get('calories', 0),
-            protein=data.get('protein', 0),
-            carbs=data.get('carbs', 0),
-            fats=data.get('fats', 0),
-            serving_size=data.get('serving_size', '1 serving')
-        )
+        food_id = db.add_food(name=data['name'], **pick_fields(data, FOOD_FIELDS))
         food = db.get_food(food_id)
         return json_response({'food': food, 'message': 'Food added successfully'}, 201)
     except Exception as e:
@@ -121,20 +217,12 @@ def add_food():
 @app.route('/api/foods/<int:food_id>', methods=['PUT'])
 def update_food(food_id):
     """Update an existing food."""
-    data = request.get_json()
+    data = get_json_body()
 
     if not data:
         return error_response('No data provided')
 
-    success = db.update_food(
-        food_id,
-        name=data.get('name'),
-        calories=data.get('calories'),
-        protein=data.get('protein'),
-        carbs=data.get('carbs'),
-        fats=data.get('fats'),
-        serving_size=data.get('serving_size')
-    )
+    success = db.update_food(food_id, **pick_fields(data, FOOD_UPDATE_FIELDS))
 
     if success:
         food = db.get_food(food_id)
@@ -199,26 +287,18 @@ def get_meals():
 @app.route('/api/meals', methods=['POST'])
 def log_meal():
     """Log a new meal."""
-    data = request.get_json()
+    data = get_json_body()
 
     if not data or not data.get('food_id'):
         return error_response('Food ID is required')
 
     try:
-        logged_at = None
-        if data.get('logged_at'):
-            logged_at = datetime.fromisoformat(data['logged_at'])
-        elif data.get('date'):
-            log_date = parse_date(data['date'])
-            if log_date:
-                logged_at = datetime.combine(log_date, datetime.now().time())
+        logged_at = resolve_logged_at(data)
 
         log_id = db.log_meal(
             food_id=data['food_id'],
-            portions=data.get('portions', 1.0),
-            meal_type=data.get('meal_type', 'snack'),
             logged_at=logged_at,
-            notes=data.get('notes')
+            **pick_fields(data, MEAL_LOG_FIELDS)
         )
 
         return json_response({'log_id': log_id, 'message': 'Meal logged'}, 201)
@@ -239,7 +319,7 @@ def delete_meal(log_id):
 @app.route('/api/meals/multi', methods=['POST'])
 def create_multi_meal():
     """Create a multi-ingredient meal."""
-    data = request.get_json()
+    data = get_json_body()
 
     if not data or not data.get('ingredients'):
         return error_response('Ingredients are required')
@@ -248,13 +328,7 @@ def create_multi_meal():
         return error_response('At least one ingredient is required')
 
     try:
-        logged_at = None
-        if data.get('logged_at'):
-            logged_at = datetime.fromisoformat(data['logged_at'])
-        elif data.get('date'):
-            log_date = parse_date(data['date'])
-            if log_date:
-                logged_at = datetime.combine(log_date, datetime.now().time())
+        logged_at = resolve_logged_at(data)
 
         meal_id = db.create_multi_meal(
             name=data.get('name', ''),
@@ -305,7 +379,7 @@ def get_all_meals():
     all_meals = db.get_all_meals_for_date(target_date)
 
     return json_response({
-        'date': target_date.isoformat(),
+        'date': target_date,
         'single_logs': all_meals['single_logs'],
         'multi_meals': all_meals['multi_meals']
     })
@@ -314,50 +388,30 @@ def get_all_meals():
 # ============== Daily Progress Endpoints ==============
 
 @app.route('/api/progress/daily', methods=['GET'])
+@app.route('/api/dashboard', methods=['GET'])
 def get_daily_progress():
-    """Get daily progress with totals and targets."""
+    """Get daily progress with totals, targets, meals and settings.
+
+    This is everything the dashboard renders, loaded in one request.
+    """
     date_str = request.args.get('date', 'today')
     target_date = parse_date(date_str)
 
     if not target_date:
         return error_response('Invalid date format')
 
-    progress = logic.calculate_daily_progress(target_date)
-    single_meals = db.get_meals_for_date(target_date)
-    multi_meals = db.get_multi_meals_for_date(target_date)
-    off_day = db.get_off_day(target_date)
-
-    # Add multi-meal totals to progress
-    for meal in multi_meals:
-        progress['totals']['calories'] += meal['total_calories']
-        progress['totals']['protein'] += meal['total_protein']
-        progress['totals']['carbs'] += meal['total_carbs']
-        progress['totals']['fats'] += meal['total_fats']
-        progress['totals']['meal_count'] += 1
-
-    # Recalculate percentages and deficit/surplus
-    targets = progress['targets']
-    totals = progress['totals']
-    progress['percentage'] = {
-        'calories': (totals['calories'] / targets['calories'] * 100) if targets['calories'] > 0 else 0,
-        'protein': (totals['protein'] / targets['protein'] * 100) if targets['protein'] > 0 else 0,
-        'carbs': (totals['carbs'] / targets['carbs'] * 100) if targets['carbs'] > 0 else 0,
-        'fats': (totals['fats'] / targets['fats'] * 100) if targets['fats'] > 0 else 0,
-    }
-    progress['remaining'] = {
-        'calories': targets['calories'] - totals['calories'],
-        'protein': targets['protein'] - totals['protein'],
-        'carbs': targets['carbs'] - totals['carbs'],
-        'fats': targets['fats'] - totals['fats'],
-    }
-    progress['deficit_surplus'] = totals['calories'] - targets['calories']
+    bundle = db.get_daily_bundle(target_date)
+    totals = bundle['totals']
+    totals['is_off_day'] = bundle['off_day'] is not None
+    progress = logic.build_progress(totals, logic.get_daily_targets(bundle['settings']))
 
     return json_response({
-        'date': target_date.isoformat(),
+        'date': target_date,
         'progress': progress,
-        'meals': single_meals,
-        'multi_meals': multi_meals,
-        'off_day': off_day
+        'meals': bundle['single_logs'],
+        'multi_meals': bundle['multi_meals'],
+        'off_day': bundle['off_day'],
+        'settings': bundle['settings']
     })
 
 
@@ -372,12 +426,9 @@ def get_weekly_progress():
     else:
         week_start = logic.get_week_start()
 
+    # orjson renders the date fields as ISO strings
     weekly = logic.calculate_weekly_averages(week_start)
 
-    # Convert date objects to strings for JSON
-    weekly['week_start'] = weekly['week_start'].isoformat()
-    weekly['week_end'] = weekly['week_end'].isoformat()
-
     return json_response({'weekly': weekly})
 
 
@@ -399,13 +450,7 @@ def debug_weekly():
     daily_multi = defaultdict(list)
 
     for meal in single_meals:
-        logged_at = meal['logged_at']
-        if isinstance(logged_at, datetime):
-            d = logged_at.date().isoformat()
-        elif isinstance(logged_at, date_type):
-            d = logged_at.isoformat()
-        else:
-            d = str(logged_at)[:10]
+        d = meal['logged_date']
         daily_single[d].append({
             'name': meal.get('name', 'unknown'),
             'calories': meal['calories'],
@@ -414,13 +459,7 @@ def debug_weekly():
         })
 
     for meal in multi_meals:
-        logged_at = meal['logged_at']
-        if isinstance(logged_at, datetime):
-            d = logged_at.date().isoformat()
-        elif isinstance(logged_at, date_type):
-            d = logged_at.isoformat()
-        else:
-            d = str(logged_at)[:10]
+        d = meal['logged_date']
         daily_multi[d].append({
             'name': meal.get('name', 'unnamed meal'),
             'total_calories': meal['total_calories'],
@@ -479,7 +518,6 @@ def debug_weekly():
             'tracked_days': actual_weekly['tracked_days'],
             'total_calories': actual_weekly['totals']['calories'],
             'average_calories': actual_weekly['averages']['calories'],
-            'debug': actual_weekly.get('debug', {})
         }
     })
 
@@ -497,10 +535,6 @@ def get_monthly_progress():
 
     monthly = logic.calculate_monthly_averages(month_start)
 
-    # Convert date objects to strings
-    monthly['month_start'] = monthly['month_start'].isoformat()
-    monthly['month_end'] = monthly['month_end'].isoformat()
-
     return json_response({'monthly': monthly})
 
 
@@ -513,15 +547,6 @@ def get_analytics_breakdown():
     weeks = logic.get_weekly_breakdown(num_weeks)
     months = logic.get_monthly_breakdown(num_months)
 
-    # Convert dates to strings
-    for week in weeks:
-        week['week_start'] = week['week_start'].isoformat()
-        week['week_end'] = week['week_end'].isoformat()
-
-    for month in months:
-        month['month_start'] = month['month_start'].isoformat()
-        month['month_end'] = month['month_end'].isoformat()
-
     return json_response({
         'weeks': weeks,
         'months': months
@@ -546,7 +571,7 @@ def get_settings():
 @app.route('/api/settings', methods=['PUT'])
 def update_settings():
     """Update settings."""
-    data = request.get_json()
+    data = get_json_body()
 
     if not data:
         return error_response('No data provided')
@@ -560,8 +585,8 @@ def update_settings():
 @app.route('/api/settings/goal', methods=['PUT'])
 def update_goal():
     """Update fitness goal."""
-    data = request.get_json()
-    goal_type = data.get('goal_type')
+    data = get_json_body()
+    goal_type = data.get('goal_type') if data else None
 
     if not goal_type or goal_type not in logic.GOAL_TYPES:
         return error_response('Invalid goal type')
@@ -587,12 +612,9 @@ def get_off_days():
         end_date = parse_date(end_str)
     else:
         # Default to current month
-        start_date = logic.get_month_start()
-        if start_date.month == 12:
-            next_month = start_date.replace(year=start_date.year + 1, month=1)
-        else:
-            next_month = start_date.replace(month=start_date.month + 1)
-        end_date = next_month - timedelta(days=1)
+        start_date = logic.get_month_start(today())
+        _, days_in_month = calendar.monthrange(start_date.year, start_date.month)
+        end_date = start_date.replace(day=days_in_month)
 
     off_days = db.get_off_days_in_range(start_date, end_date)
 
@@ -605,7 +627,7 @@ def get_off_days():
 @app.route('/api/off-days', methods=['POST'])
 def add_off_day():
     """Add an off day."""
-    data = request.get_json()
+    data = get_json_body()
 
     if not data or not data.get('date'):
         return error_response('Date is required')
@@ -640,11 +662,13 @@ def remove_off_day(date_str):
 def get_weight_history():
     """Get weight history."""
     limit = request.args.get('limit', 30, type=int)
-    history = db.get_weight_history(limit)
-    progress = logic.calculate_weight_progress()
+
+    # One query covers both the requested history and the progress window
+    entries = db.get_weight_history(max(limit, logic.WEIGHT_PROGRESS_ENTRIES))
+    progress = logic.build_weight_progress(entries[:logic.WEIGHT_PROGRESS_ENTRIES])
 
     return json_response({
-        'history': history,
+        'history': entries[:limit],
         'progress': progress
     })
 
@@ -652,7 +676,7 @@ def get_weight_history():
 @app.route('/api/weight', methods=['POST'])
 def log_weight():
     """Log a weight entry."""
-    data = request.get_json()
+    data = get_json_body()
 
     if not data or not data.get('weight'):
         return error_response('Weight is required')
@@ -674,15 +698,14 @@ def log_weight():
 
 @app.route('/api/export', methods=['GET'])
 def export_data():
-    """Export all data as JSON."""
-    data = db.export_data()
-    return json_response(data)
+    """Export all data as JSON, streamed table by table."""
+    return Response(db.iter_export_json(), mimetype='application/json')
 
 
 @app.route('/api/import', methods=['POST'])
 def import_data():
     """Import data from JSON."""
-    data = request.get_json()
+    data = get_json_body()
 
     if not data:
         return error_response('No data provided')
@@ -701,7 +724,7 @@ def import_data():
 @app.route('/api/foods/import', methods=['POST'])
 def import_foods_bulk():
     """Bulk import foods into the database."""
-    data = request.get_json()
+    data = get_json_body()
 
     if not data or not data.get('foods'):
         return error_response('Foods list is required')
@@ -3,14 +3,20 @@ CLI Interface module for Food Tracker.
 Handles all user interaction and display formatting.
 """
 
+import calendar
 import sys
+from collections import defaultdict
 from datetime import date, datetime, timedelta
+from functools import lru_cache
+from itertools import pairwise
+from pathlib import Path
 from typing import Optional, List
 
-from rich.console import Console
+import orjson
+from rich.console import Console, Group
 from rich.table import Table
 from rich.panel import Panel
-from rich.prompt import Prompt, IntPrompt, FloatPrompt, Confirm
+from rich.prompt import Prompt, Confirm
 from rich.progress import Progress, BarColumn, TextColumn
 from rich.layout import Layout
 from rich.text import Text
@@ -19,7 +25,8 @@ from rich import box
 import database as db
 import logic
 
-console = Console()
+# Highlighting is off: output is styled explicitly and the regex pass is costly
+console = Console(highlight=False)
 
 
 # ============== Helper Functions ==============
@@ -29,26 +36,33 @@ def clear_screen():
     console.clear()
 
 
+def header_text(title: str) -> Text:
+    """Build a styled header (title underlined, no panel layout)."""
+    return Text.assemble(
+        "\n",
+        (title, "bold cyan"), "\n",
+        ("═" * len(title), "cyan"), "\n"
+    )
+
+
 def print_header(title: str):
     """Print a styled header."""
-    console.print()
-    console.print(Panel(f"[bold cyan]{title}[/bold cyan]", box=box.DOUBLE))
-    console.print()
+    console.print(header_text(title))
 
 
 def print_success(message: str):
     """Print a success message."""
-    console.print(f"[green]{message}[/green]")
+    console.print(message, style="green", markup=False)
 
 
 def print_error(message: str):
     """Print an error message."""
-    console.print(f"[red]Error: {message}[/red]")
+    console.print(f"Error: {message}", style="red", markup=False)
 
 
 def print_warning(message: str):
     """Print a warning message."""
-    console.print(f"[yellow]{message}[/yellow]")
+    console.print(message, style="yellow", markup=False)
 
 
 def press_enter_to_continue():
@@ -57,15 +71,48 @@ def press_enter_to_continue():
     Prompt.ask("[dim]Press Enter to continue[/dim]")
 
 
+def _ask_number(prompt: str, cast, default, error: str):
+    """Read a number with a plain input() call, re-asking until it parses."""
+    suffix = f" ({default})" if default is not None else ""
+    while True:
+        value = console.input(f"{prompt}{suffix}: ", markup=False).strip()
+        if not value and default is not None:
+            return default
+        try:
+            return cast(value)
+        except ValueError:
+            print_error(error)
+
+
+def ask_int(prompt: str, default: int = None) -> int:
+    """Prompt for an integer."""
+    return _ask_number(prompt, int, default, "Please enter a valid integer number.")
+
+
+def ask_float(prompt: str, default: float = None) -> float:
+    """Prompt for a number."""
+    return _ask_number(prompt, float, default, "Please enter a number.")
+
+
+DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%Y', '%m-%d-%Y', '%d/%m/%Y')
+
+
 def parse_date(date_str: str) -> Optional[date]:
     """Parse a date string. Returns None if invalid."""
-    if not date_str or date_str.lower() == 'today':
-        return date.today()
-    if date_str.lower() == 'yesterday':
-        return date.today() - timedelta(days=1)
+    # Keyed on today's ordinal so 'today'/'yesterday' roll over at midnight
+    return _parse_date_cached(date_str or '', date.today().toordinal())
+
 
-    formats = ['%Y-%m-%d', '%m/%d/%Y', '%m-%d-%Y', '%d/%m/%Y']
-    for fmt in formats:
+@lru_cache(maxsize=256)
+def _parse_date_cached(date_str: str, today_ordinal: int) -> Optional[date]:
+    """Parse a date string relative to the given day."""
+    token = date_str.lower()
+    if not token or token == 'today':
+        return date.fromordinal(today_ordinal)
+    if token == 'yesterday':
+        return date.fromordinal(today_ordinal - 1)
+
+    for fmt in DATE_FORMATS:
         try:
             return datetime.strptime(date_str, fmt).date()
         except ValueError:
@@ -73,19 +120,53 @@ def parse_date(date_str: str) -> Optional[date]:
     return None
 
 
+# Fixed-precision formatters for the precisions the tables use
+_NUMBER_FORMATTERS = {
+    0: lambda value: f"{int(round(value)):,}",
+    1: lambda value: f"{value:,.1f}",
+    2: lambda value: f"{value:,.2f}",
+}
+
+
 def format_number(value: float, decimals: int = 1) -> str:
     """Format a number for display."""
-    if decimals == 0:
-        return f"{int(round(value)):,}"
-    return f"{value:,.{decimals}f}"
+    formatter = _NUMBER_FORMATTERS.get(decimals)
+    if formatter is None:
+        return f"{value:,.{decimals}f}"
+    return formatter(value)
+
+
+# Meal type labels and the numbered prompt never change, so build them once
+MEAL_TYPE_LABELS = {meal_type: meal_type.capitalize() for meal_type in logic.MEAL_TYPES}
+MEAL_TYPE_CHOICES = [str(i) for i in range(1, len(logic.MEAL_TYPES) + 1)]
+MEAL_TYPE_MENU = "\n".join(f"  [{i}] {label}"
+                           for i, label in enumerate(MEAL_TYPE_LABELS.values(), 1))
+
+
+def ask_meal_type() -> str:
+    """Prompt for a meal type from the numbered list."""
+    console.print("Meal type:")
+    console.print(MEAL_TYPE_MENU, markup=False)
+    choice = Prompt.ask("Choice", choices=MEAL_TYPE_CHOICES, default="1")
+    return logic.MEAL_TYPES[int(choice) - 1]
 
 
 # ============== Progress Bar Display ==============
 
-def create_progress_bar(current: float, target: float, width: int = 30) -> str:
-    """Create a text-based progress bar."""
+# Bars are sliced from these instead of building new strings on every call
+PROGRESS_BAR_MAX_WIDTH = 60
+_BAR_FILLED = '█' * PROGRESS_BAR_MAX_WIDTH
+_BAR_EMPTY = '░' * PROGRESS_BAR_MAX_WIDTH
+
+
+def create_progress_bar(current: float, target: float, width: int = 30) -> Text:
+    """Create a styled progress bar (width up to PROGRESS_BAR_MAX_WIDTH).
+
+    Returns a Text with the styles already applied, so printing it skips
+    Rich's markup parser.
+    """
     if target <= 0:
-        return "[dim]No target set[/dim]"
+        return Text("No target set", style="dim")
 
     percentage = min(current / target, 1.5)  # Cap at 150% for display
     filled = int(percentage * width)
@@ -96,22 +177,21 @@ def create_progress_bar(current: float, target: float, width: int = 30) -> str:
     else:
         color = "blue"
 
-    bar = f"[{color}]{'█' * filled}[/{color}][dim]{'░' * (width - filled)}[/dim]"
-    pct_str = f"{percentage * 100:.0f}%"
-
-    return f"{bar} {pct_str}"
+    return Text.assemble(
+        (_BAR_FILLED[:filled], color),
+        (_BAR_EMPTY[:width - filled], "dim"),
+        f" {percentage * 100:.0f}%"
+    )
 
 
 # ============== Food Management ==============
 
-def display_food_table(foods: List[dict], show_id: bool = True):
-    """Display a table of foods."""
-    if not foods:
-        print_warning("No foods found.")
-        return
+FAVORITE_MARK = Text("★", style="yellow")
 
-    table = Table(box=box.ROUNDED, show_header=True, header_style="bold magenta")
 
+def new_food_table(show_id: bool = True) -> Table:
+    """Create an empty foods table with its columns set up."""
+    table = Table(box=box.ROUNDED, show_header=True, header_style="bold magenta")
     if show_id:
         table.add_column("ID", style="dim", width=5)
     table.add_column("Name", style="cyan", min_width=20)
@@ -121,22 +201,30 @@ def display_food_table(foods: List[dict], show_id: bool = True):
     table.add_column("Fats", justify="right")
     table.add_column("Serving", style="dim")
     table.add_column("Fav", justify="center")
+    return table
+
+
+def display_food_table(foods: List[dict], show_id: bool = True):
+    """Display a table of foods."""
+    if not foods:
+        print_warning("No foods found.")
+        return
 
+    table = new_food_table(show_id)
     for food in foods:
-        fav = "[yellow]★[/yellow]" if food['is_favorite'] else ""
-        row = []
-        if show_id:
-            row.append(str(food['id']))
-        row.extend([
+        row = (
             food['name'],
             format_number(food['calories'], 0),
             f"{format_number(food['protein'], 1)}g",
             f"{format_number(food['carbs'], 1)}g",
             f"{format_number(food['fats'], 1)}g",
             food.get('serving_size', '1 serving'),
-            fav
-        ])
-        table.add_row(*row)
+            FAVORITE_MARK if food['is_favorite'] else ""
+        )
+        if show_id:
+            table.add_row(str(food['id']), *row)
+        else:
+            table.add_row(*row)
 
     console.print(table)
 
@@ -152,17 +240,16 @@ def add_food_menu():
 
     # Check if food already exists
     existing = db.search_foods(name)
-    if existing:
-        exact_match = [f for f in existing if f['name'].lower() == name.lower()]
-        if exact_match:
-            print_warning(f"A food named '{name}' already exists.")
-            if not Confirm.ask("Add anyway with a different name?"):
-                return
+    lower_name = name.lower()
+    if any(f['name'].lower() == lower_name for f in existing):
+        print_warning(f"A food named '{name}' already exists.")
+        if not Confirm.ask("Add anyway with a different name?"):
+            return
 
-    calories = FloatPrompt.ask("Calories per serving", default=0.0)
-    protein = FloatPrompt.ask("Protein (g)", default=0.0)
-    carbs = FloatPrompt.ask("Carbs (g)", default=0.0)
-    fats = FloatPrompt.ask("Fats (g)", default=0.0)
+    calories = ask_float("Calories per serving", default=0.0)
+    protein = ask_float("Protein (g)", default=0.0)
+    carbs = ask_float("Carbs (g)", default=0.0)
+    fats = ask_float("Fats (g)", default=0.0)
     serving_size = Prompt.ask("Serving size", default="1 serving")
 
     try:
@@ -198,17 +285,17 @@ def search_foods_menu():
     action = Prompt.ask("Action", default="")
 
     if action.lower() == 'e':
-        food_id = IntPrompt.ask("Enter food ID to edit")
+        food_id = ask_int("Enter food ID to edit")
         edit_food_menu(food_id)
     elif action.lower() == 'd':
-        food_id = IntPrompt.ask("Enter food ID to delete")
+        food_id = ask_int("Enter food ID to delete")
         if Confirm.ask(f"Are you sure you want to delete food {food_id}?"):
             if db.delete_food(food_id):
                 print_success("Food deleted.")
             else:
                 print_error("Food not found.")
     elif action.lower() == 'f':
-        food_id = IntPrompt.ask("Enter food ID to toggle favorite")
+        food_id = ask_int("Enter food ID to toggle favorite")
         is_fav = db.toggle_favorite(food_id)
         print_success(f"Food {'marked as' if is_fav else 'removed from'} favorites.")
 
@@ -232,10 +319,10 @@ def edit_food_menu(food_id: int):
     console.print()
 
     name = Prompt.ask("New name", default=food['name'])
-    calories = FloatPrompt.ask("Calories", default=food['calories'])
-    protein = FloatPrompt.ask("Protein (g)", default=food['protein'])
-    carbs = FloatPrompt.ask("Carbs (g)", default=food['carbs'])
-    fats = FloatPrompt.ask("Fats (g)", default=food['fats'])
+    calories = ask_float("Calories", default=food['calories'])
+    protein = ask_float("Protein (g)", default=food['protein'])
+    carbs = ask_float("Carbs (g)", default=food['carbs'])
+    fats = ask_float("Fats (g)", default=food['fats'])
     serving_size = Prompt.ask("Serving size", default=food['serving_size'])
 
     if db.update_food(food_id, name, calories, protein, carbs, fats, serving_size):
@@ -258,6 +345,17 @@ def view_favorites_menu():
 
 # ============== Meal Logging ==============
 
+FOOD_SOURCE_CHOICES = ["1", "2", "3", "4"]
+
+
+def select_food(foods: List[dict]) -> Optional[dict]:
+    """Ask for a food ID, resolving it from the listed foods when possible."""
+    food_id = ask_int("Select food ID")
+    by_id = {f['id']: f for f in foods}
+    # IDs that were not listed still go to the database, as before
+    return by_id.get(food_id) or db.get_food(food_id)
+
+
 def log_meal_menu():
     """Menu to log a meal."""
     print_header("Log Meal")
@@ -269,7 +367,7 @@ def log_meal_menu():
     console.print("  [4] Add new food first")
     console.print()
 
-    choice = Prompt.ask("Choice", choices=["1", "2", "3", "4"], default="1")
+    choice = Prompt.ask("Choice", choices=FOOD_SOURCE_CHOICES, default="1")
 
     food = None
 
@@ -282,8 +380,7 @@ def log_meal_menu():
                 add_food_menu()
             return
         display_food_table(foods)
-        food_id = IntPrompt.ask("Select food ID")
-        food = db.get_food(food_id)
+        food = select_food(foods)
 
     elif choice == "2":
         foods = db.get_recent_foods(10)
@@ -291,8 +388,7 @@ def log_meal_menu():
             print_warning("No recent foods. Log some meals first!")
             return
         display_food_table(foods)
-        food_id = IntPrompt.ask("Select food ID")
-        food = db.get_food(food_id)
+        food = select_food(foods)
 
     elif choice == "3":
         foods = db.get_favorite_foods()
@@ -300,8 +396,7 @@ def log_meal_menu():
             print_warning("No favorite foods yet.")
             return
         display_food_table(foods)
-        food_id = IntPrompt.ask("Select food ID")
-        food = db.get_food(food_id)
+        food = select_food(foods)
 
     elif choice == "4":
         add_food_menu()
@@ -317,15 +412,10 @@ def log_meal_menu():
                   f"{food['protein']}g protein, {food['carbs']}g carbs, {food['fats']}g fats[/dim]")
     console.print()
 
-    portions = FloatPrompt.ask("Portions", default=1.0)
+    portions = ask_float("Portions", default=1.0)
 
     console.print()
-    console.print("Meal type:")
-    for i, meal_type in enumerate(logic.MEAL_TYPES, 1):
-        console.print(f"  [{i}] {meal_type.capitalize()}")
-
-    meal_choice = Prompt.ask("Choice", choices=["1", "2", "3", "4"], default="1")
-    meal_type = logic.MEAL_TYPES[int(meal_choice) - 1]
+    meal_type = ask_meal_type()
 
     date_str = Prompt.ask("Date (YYYY-MM-DD or 'today')", default="today")
     log_date = parse_date(date_str)
@@ -360,13 +450,11 @@ def view_meals_for_date(target_date: date):
     """View meals for a specific date."""
     print_header(f"Meals for {target_date.strftime('%A, %B %d, %Y')}")
 
-    if db.is_off_day(target_date):
-        off_day = db.get_off_day(target_date)
-        console.print(Panel(
-            f"[yellow]OFF DAY[/yellow] - {off_day['reason'].capitalize()}",
-            box=box.ROUNDED
+    off_day = db.get_off_day(target_date)
+    if off_day:
+        console.print(Text.assemble(
+            ("OFF DAY", "bold yellow"), f" - {off_day['reason'].capitalize()}\n"
         ))
-        console.print()
 
     meals = db.get_meals_for_date(target_date)
 
@@ -375,18 +463,39 @@ def view_meals_for_date(target_date: date):
         return
 
     # Group by meal type
-    by_type = {}
+    by_type = defaultdict(list)
     for meal in meals:
-        mt = meal['meal_type']
-        if mt not in by_type:
-            by_type[mt] = []
-        by_type[mt].append(meal)
+        by_type[meal['meal_type']].append(meal)
+
+    # Daily totals
+    progress = logic.calculate_daily_progress(target_date)
 
+    # Buffer all meal tables and the summary into a single terminal write
+    with console:
+        display_meals_by_type(by_type)
+        console.print()
+        display_daily_summary(progress)
+
+    console.print()
+    console.print("[dim]Actions: (d)elete meal, (Enter) to go back[/dim]")
+    action = Prompt.ask("Action", default="")
+
+    if action.lower() == 'd':
+        log_id = ask_int("Enter meal log ID to delete")
+        if Confirm.ask(f"Delete meal log {log_id}?"):
+            if db.delete_meal_log(log_id):
+                print_success("Meal deleted.")
+            else:
+                print_error("Meal log not found.")
+
+
+def display_meals_by_type(by_type: dict):
+    """Display one table per meal type with its calorie subtotal."""
     for meal_type in logic.MEAL_TYPES:
         if meal_type not in by_type:
             continue
 
-        console.print(f"\n[bold]{meal_type.capitalize()}[/bold]")
+        console.print(f"\n[bold]{MEAL_TYPE_LABELS[meal_type]}[/bold]")
 
         table = Table(box=box.SIMPLE, show_header=True, header_style="dim")
         table.add_column("ID", style="dim", width=5)
@@ -397,13 +506,14 @@ def view_meals_for_date(target_date: date):
 
         meal_total = 0
         for meal in by_type[meal_type]:
-            cals = meal['calories'] * meal['portions']
+            portions = meal['portions']
+            cals = meal['calories'] * portions
             meal_total += cals
-            pcf = f"{meal['protein'] * meal['portions']:.0f}/{meal['carbs'] * meal['portions']:.0f}/{meal['fats'] * meal['portions']:.0f}"
+            pcf = f"{meal['protein'] * portions:.0f}/{meal['carbs'] * portions:.0f}/{meal['fats'] * portions:.0f}"
             table.add_row(
                 str(meal['log_id']),
                 meal['name'],
-                f"{meal['portions']:.1f}",
+                f"{portions:.1f}",
                 f"{cals:.0f}",
                 pcf
             )
@@ -411,57 +521,44 @@ def view_meals_for_date(target_date: date):
         console.print(table)
         console.print(f"[dim]Subtotal: {meal_total:.0f} cal[/dim]")
 
-    # Daily totals
-    progress = logic.calculate_daily_progress(target_date)
-    console.print()
-    display_daily_summary(progress)
-
-    console.print()
-    console.print("[dim]Actions: (d)elete meal, (Enter) to go back[/dim]")
-    action = Prompt.ask("Action", default="")
-
-    if action.lower() == 'd':
-        log_id = IntPrompt.ask("Enter meal log ID to delete")
-        if Confirm.ask(f"Delete meal log {log_id}?"):
-            if db.delete_meal_log(log_id):
-                print_success("Meal deleted.")
-            else:
-                print_error("Meal log not found.")
-
 
 def display_daily_summary(progress: dict):
     """Display daily progress summary with progress bars."""
     totals = progress['totals']
     targets = progress['targets']
 
-    console.print(Panel("[bold]Daily Summary[/bold]", box=box.ROUNDED))
-
     # Calories
     cal_bar = create_progress_bar(totals['calories'], targets['calories'])
-    console.print(f"Calories:  {format_number(totals['calories'], 0):>6} / {targets['calories']} {cal_bar}")
+    cal_line = Text.assemble(f"Calories:  {format_number(totals['calories'], 0):>6} / {targets['calories']} ", cal_bar)
 
     # Protein
     pro_bar = create_progress_bar(totals['protein'], targets['protein'])
-    console.print(f"Protein:   {format_number(totals['protein'], 1):>6}g / {targets['protein']}g {pro_bar}")
+    pro_line = Text.assemble(f"Protein:   {format_number(totals['protein'], 1):>6}g / {targets['protein']}g ", pro_bar)
 
     # Carbs
     carb_bar = create_progress_bar(totals['carbs'], targets['carbs'])
-    console.print(f"Carbs:     {format_number(totals['carbs'], 1):>6}g / {targets['carbs']}g {carb_bar}")
+    carb_line = Text.assemble(f"Carbs:     {format_number(totals['carbs'], 1):>6}g / {targets['carbs']}g ", carb_bar)
 
     # Fats
     fat_bar = create_progress_bar(totals['fats'], targets['fats'])
-    console.print(f"Fats:      {format_number(totals['fats'], 1):>6}g / {targets['fats']}g {fat_bar}")
-
-    console.print()
+    fat_line = Text.assemble(f"Fats:      {format_number(totals['fats'], 1):>6}g / {targets['fats']}g ", fat_bar)
 
     # Deficit/Surplus
     diff = progress['deficit_surplus']
     if diff > 0:
-        console.print(f"[yellow]Surplus: +{diff:.0f} calories[/yellow]")
+        diff_line = Text(f"Surplus: +{diff:.0f} calories", style="yellow")
     elif diff < 0:
-        console.print(f"[green]Deficit: {diff:.0f} calories[/green]")
+        diff_line = Text(f"Deficit: {diff:.0f} calories", style="green")
     else:
-        console.print("[blue]On target![/blue]")
+        diff_line = Text("On target!", style="blue")
+
+    # One print for the whole summary
+    console.print(Group(
+        Panel(Text("Daily Summary", style="bold"), box=box.ROUNDED),
+        cal_line, pro_line, carb_line, fat_line,
+        Text(),
+        diff_line
+    ))
 
 
 # ============== Dashboard ==============
@@ -471,14 +568,16 @@ def display_dashboard():
     clear_screen()
     print_header("Food Tracker Dashboard")
 
+    # Settings are read once and shared by the goal and progress sections
+    settings = db.get_all_settings()
+
     # Current goal
-    goal = logic.get_current_goal()
-    goal_info = logic.get_goal_info(goal)
+    goal_info = logic.get_goal_info(settings.get('goal_type', 'maintenance'))
     console.print(f"[bold]Current Goal:[/bold] {goal_info['name']} - {goal_info['description']}")
     console.print()
 
     # Today's progress
-    today_progress = logic.calculate_daily_progress()
+    today_progress = logic.calculate_daily_progress(settings=settings)
     console.print("[bold cyan]Today's Progress[/bold cyan]")
     if today_progress['is_off_day']:
         console.print("[yellow]Today is marked as an off day[/yellow]")
@@ -513,21 +612,27 @@ def display_dashboard():
 
 # ============== Analytics ==============
 
+# Static menu bodies, built once and printed in a single call
+ANALYTICS_MENU = (
+    "  [1] Weekly Breakdown\n"
+    "  [2] Monthly Breakdown\n"
+    "  [3] View Specific Date\n"
+    "  [4] Weight History\n"
+    "  [5] Off Days Summary\n"
+    "  [0] Back to Main Menu\n"
+)
+ANALYTICS_CHOICES = ["0", "1", "2", "3", "4", "5"]
+
+
 def analytics_menu():
     """Analytics submenu."""
     while True:
         clear_screen()
         print_header("Analytics")
 
-        console.print("  [1] Weekly Breakdown")
-        console.print("  [2] Monthly Breakdown")
-        console.print("  [3] View Specific Date")
-        console.print("  [4] Weight History")
-        console.print("  [5] Off Days Summary")
-        console.print("  [0] Back to Main Menu")
-        console.print()
+        console.print(ANALYTICS_MENU, markup=False)
 
-        choice = Prompt.ask("Choice", choices=["0", "1", "2", "3", "4", "5"], default="0")
+        choice = Prompt.ask("Choice", choices=ANALYTICS_CHOICES, default="0")
 
         if choice == "0":
             break
@@ -549,23 +654,34 @@ def analytics_menu():
             display_off_days_summary()
 
 
-def display_weekly_breakdown():
-    """Display week-by-week breakdown."""
-    print_header("Weekly Breakdown")
+# calendar.month_abbr formats on every lookup, so take a copy once
+MONTH_ABBR = tuple(calendar.month_abbr)
 
-    weeks = logic.get_weekly_breakdown(4)
 
+def new_averages_table(period_label: str, min_width: int) -> Table:
+    """Create an empty table of per-period averages (weekly or monthly)."""
     table = Table(box=box.ROUNDED, show_header=True, header_style="bold magenta")
-    table.add_column("Week", min_width=20)
+    table.add_column(period_label, min_width=min_width)
     table.add_column("Avg Cal", justify="right")
     table.add_column("Avg Protein", justify="right")
     table.add_column("Avg Carbs", justify="right")
     table.add_column("Avg Fats", justify="right")
     table.add_column("Days", justify="center")
     table.add_column("Off", justify="center")
+    return table
+
+
+def display_weekly_breakdown():
+    """Display week-by-week breakdown."""
+    print_header("Weekly Breakdown")
+
+    weeks = logic.get_weekly_breakdown(4)
+
+    table = new_averages_table("Week", min_width=20)
 
     for week in weeks:
-        week_label = f"{week['week_start'].strftime('%b %d')} - {week['week_end'].strftime('%b %d')}"
+        start, end = week['week_start'], week['week_end']
+        week_label = f"{MONTH_ABBR[start.month]} {start.day:02d} - {MONTH_ABBR[end.month]} {end.day:02d}"
         table.add_row(
             week_label,
             f"{week['averages']['calories']:.0f}",
@@ -586,14 +702,7 @@ def display_monthly_breakdown():
 
     months = logic.get_monthly_breakdown(3)
 
-    table = Table(box=box.ROUNDED, show_header=True, header_style="bold magenta")
-    table.add_column("Month", min_width=15)
-    table.add_column("Avg Cal", justify="right")
-    table.add_column("Avg Protein", justify="right")
-    table.add_column("Avg Carbs", justify="right")
-    table.add_column("Avg Fats", justify="right")
-    table.add_column("Days", justify="center")
-    table.add_column("Off", justify="center")
+    table = new_averages_table("Month", min_width=15)
 
     for month in months:
         table.add_row(
@@ -628,23 +737,22 @@ def display_weight_history():
     table.add_column("Change", justify="right")
     table.add_column("Notes")
 
-    prev_weight = None
-    for entry in reversed(history):
+    # Oldest first, each entry paired with its change from the one before
+    chronological = history[::-1]
+    diffs = [None] + [entry['weight'] - prev['weight']
+                      for prev, entry in pairwise(chronological)]
+
+    for entry, diff in zip(chronological, diffs):
         change = ""
-        if prev_weight is not None:
-            diff = entry['weight'] - prev_weight
-            if diff > 0:
-                change = f"[red]+{diff:.1f}[/red]"
-            elif diff < 0:
-                change = f"[green]{diff:.1f}[/green]"
+        if diff:
+            change = Text(f"{diff:+.1f}", style="red" if diff > 0 else "green")
 
         table.add_row(
-            entry['recorded_at'],
+            str(entry['recorded_at']),
             f"{entry['weight']:.1f} lbs",
             change,
             entry.get('notes') or ""
         )
-        prev_weight = entry['weight']
 
     console.print(table)
     press_enter_to_continue()
@@ -662,31 +770,23 @@ def display_off_days_summary():
         next_month = month_start.replace(month=month_start.month + 1)
     month_end = next_month - timedelta(days=1)
 
-    off_days = db.get_off_days_in_range(month_start, month_end)
+    by_reason = db.get_off_day_reason_summary(month_start, month_end)
 
     console.print(f"[bold]This Month ({month_start.strftime('%B %Y')})[/bold]")
-    console.print(f"Total off days: {len(off_days)}")
+    console.print(f"Total off days: {sum(row['count'] for row in by_reason)}")
     console.print()
 
-    if off_days:
-        # Group by reason
-        by_reason = {}
-        for od in off_days:
-            reason = od['reason']
-            if reason not in by_reason:
-                by_reason[reason] = []
-            by_reason[reason].append(od)
-
+    if by_reason:
         table = Table(box=box.SIMPLE, show_header=True)
         table.add_column("Reason")
         table.add_column("Count", justify="right")
         table.add_column("Dates")
 
-        for reason, days in by_reason.items():
-            dates = ", ".join([d['date'] for d in days[:3]])
-            if len(days) > 3:
-                dates += f" (+{len(days) - 3} more)"
-            table.add_row(reason.capitalize(), str(len(days)), dates)
+        for row in by_reason:
+            dates = ", ".join(row['dates'])
+            if row['count'] > 3:
+                dates += f" (+{row['count'] - 3} more)"
+            table.add_row(row['reason'].capitalize(), str(row['count']), dates)
 
         console.print(table)
 
@@ -695,6 +795,19 @@ def display_off_days_summary():
 
 # ============== Settings ==============
 
+SETTINGS_MENU = (
+    "  [1] Change Goal\n"
+    "  [2] Set Calorie Target\n"
+    "  [3] Set Macro Targets\n"
+    "  [4] Log Weight\n"
+    "  [5] Manage Off Days\n"
+    "  [6] Export Data\n"
+    "  [7] Import Data\n"
+    "  [0] Back to Main Menu\n"
+)
+SETTINGS_CHOICES = ["0", "1", "2", "3", "4", "5", "6", "7"]
+
+
 def settings_menu():
     """Settings submenu."""
     while True:
@@ -713,26 +826,18 @@ def settings_menu():
         console.print(f"  Fats Target: {settings.get('fats_target', '65')}g")
         console.print()
 
-        console.print("  [1] Change Goal")
-        console.print("  [2] Set Calorie Target")
-        console.print("  [3] Set Macro Targets")
-        console.print("  [4] Log Weight")
-        console.print("  [5] Manage Off Days")
-        console.print("  [6] Export Data")
-        console.print("  [7] Import Data")
-        console.print("  [0] Back to Main Menu")
-        console.print()
+        console.print(SETTINGS_MENU, markup=False)
 
-        choice = Prompt.ask("Choice", choices=["0", "1", "2", "3", "4", "5", "6", "7"], default="0")
+        choice = Prompt.ask("Choice", choices=SETTINGS_CHOICES, default="0")
 
         if choice == "0":
             break
         elif choice == "1":
             change_goal_menu()
         elif choice == "2":
-            set_calorie_target_menu()
+            set_calorie_target_menu(settings)
         elif choice == "3":
-            set_macro_targets_menu()
+            set_macro_targets_menu(settings)
         elif choice == "4":
             log_weight_menu()
         elif choice == "5":
@@ -743,6 +848,9 @@ def settings_menu():
             import_data_menu()
 
 
+GOAL_CHOICES = [str(i) for i in range(1, len(logic.GOAL_TYPES) + 1)]
+
+
 def change_goal_menu():
     """Change fitness goal."""
     print_header("Change Goal")
@@ -753,7 +861,7 @@ def change_goal_menu():
         console.print(f"      Calorie adjustment: {info['calorie_modifier']:+d}")
         console.print()
 
-    choice = Prompt.ask("Select goal", choices=["1", "2", "3"])
+    choice = Prompt.ask("Select goal", choices=GOAL_CHOICES)
     goal_keys = list(logic.GOAL_TYPES.keys())
     selected = goal_keys[int(choice) - 1]
 
@@ -761,7 +869,7 @@ def change_goal_menu():
     print_success(f"Goal set to {logic.GOAL_TYPES[selected]['name']}")
 
     if Confirm.ask("Would you like to adjust your calorie target based on this goal?"):
-        base = IntPrompt.ask("Enter your maintenance calories", default=2000)
+        base = ask_int("Enter your maintenance calories", default=2000)
         new_target = logic.calculate_recommended_calories(base)
         logic.set_daily_targets(calories=new_target)
         print_success(f"Calorie target set to {new_target}")
@@ -769,26 +877,26 @@ def change_goal_menu():
     press_enter_to_continue()
 
 
-def set_calorie_target_menu():
+def set_calorie_target_menu(settings: dict):
     """Set daily calorie target."""
-    current = int(db.get_setting('daily_calorie_target', '2000'))
-    new_target = IntPrompt.ask("Daily calorie target", default=current)
+    current = int(settings.get('daily_calorie_target', '2000'))
+    new_target = ask_int("Daily calorie target", default=current)
     logic.set_daily_targets(calories=new_target)
     print_success(f"Daily calorie target set to {new_target}")
     press_enter_to_continue()
 
 
-def set_macro_targets_menu():
+def set_macro_targets_menu(settings: dict):
     """Set macro targets."""
     print_header("Set Macro Targets")
 
-    current_protein = int(db.get_setting('protein_target', '150'))
-    current_carbs = int(db.get_setting('carbs_target', '200'))
-    current_fats = int(db.get_setting('fats_target', '65'))
+    current_protein = int(settings.get('protein_target', '150'))
+    current_carbs = int(settings.get('carbs_target', '200'))
+    current_fats = int(settings.get('fats_target', '65'))
 
-    protein = IntPrompt.ask("Protein target (g)", default=current_protein)
-    carbs = IntPrompt.ask("Carbs target (g)", default=current_carbs)
-    fats = IntPrompt.ask("Fats target (g)", default=current_fats)
+    protein = ask_int("Protein target (g)", default=current_protein)
+    carbs = ask_int("Carbs target (g)", default=current_carbs)
+    fats = ask_int("Fats target (g)", default=current_fats)
 
     logic.set_daily_targets(protein=protein, carbs=carbs, fats=fats)
 
@@ -804,7 +912,7 @@ def log_weight_menu():
     """Log weight entry."""
     print_header("Log Weight")
 
-    weight = FloatPrompt.ask("Weight (lbs)")
+    weight = ask_float("Weight (lbs)")
     date_str = Prompt.ask("Date (YYYY-MM-DD or 'today')", default="today")
     record_date = parse_date(date_str)
     if not record_date:
@@ -818,20 +926,25 @@ def log_weight_menu():
     press_enter_to_continue()
 
 
+OFF_DAYS_MENU = (
+    "  [1] Mark today as off day\n"
+    "  [2] Mark another date as off day\n"
+    "  [3] Remove off day\n"
+    "  [4] View off days this month\n"
+    "  [0] Back\n"
+)
+OFF_DAYS_CHOICES = ["0", "1", "2", "3", "4"]
+
+
 def manage_off_days_menu():
     """Manage off days."""
     while True:
         clear_screen()
         print_header("Manage Off Days")
 
-        console.print("  [1] Mark today as off day")
-        console.print("  [2] Mark another date as off day")
-        console.print("  [3] Remove off day")
-        console.print("  [4] View off days this month")
-        console.print("  [0] Back")
-        console.print()
+        console.print(OFF_DAYS_MENU, markup=False)
 
-        choice = Prompt.ask("Choice", choices=["0", "1", "2", "3", "4"], default="0")
+        choice = Prompt.ask("Choice", choices=OFF_DAYS_CHOICES, default="0")
 
         if choice == "0":
             break
@@ -861,6 +974,9 @@ def manage_off_days_menu():
             display_off_days_summary()
 
 
+OFF_DAY_REASON_CHOICES = [str(i) for i in range(1, len(db.OFF_DAY_REASONS) + 1)]
+
+
 def add_off_day_for_date(target_date: date):
     """Add an off day with reason selection."""
     console.print(f"\nMarking {target_date} as off day")
@@ -868,7 +984,7 @@ def add_off_day_for_date(target_date: date):
     for i, reason in enumerate(db.OFF_DAY_REASONS, 1):
         console.print(f"  [{i}] {reason.capitalize()}")
 
-    choice = Prompt.ask("Select reason", choices=[str(i) for i in range(1, len(db.OFF_DAY_REASONS) + 1)])
+    choice = Prompt.ask("Select reason", choices=OFF_DAY_REASON_CHOICES)
     reason = db.OFF_DAY_REASONS[int(choice) - 1]
 
     notes = ""
@@ -882,10 +998,22 @@ def add_off_day_for_date(target_date: date):
 
 # ============== Data Export/Import ==============
 
+BACKUP_TABLES = {
+    'foods': "Foods",
+    'meal_logs': "Meal logs",
+    'off_days': "Off days",
+    'weight_history': "Weight entries",
+}
+
+
+def print_backup_counts(counts: dict):
+    """Print the row count of each backup table in one write."""
+    console.print("\n".join(f"  {label}: {counts.get(table, 0)}"
+                            for table, label in BACKUP_TABLES.items()), markup=False)
+
+
 def export_data_menu():
     """Export data to JSON file."""
-    import json
-    from pathlib import Path
 
     print_header("Export Data")
 
@@ -894,24 +1022,24 @@ def export_data_menu():
     path = Path(path_str)
 
     try:
-        data = db.export_data()
-        with open(path, 'w') as f:
-            json.dump(data, f, indent=2, default=str)
+        # Stream rows to the file instead of loading the whole backup first
+        counts = {}
+        with open(path, 'wb') as f:
+            for chunk in db.iter_export_json(counts):
+                f.write(chunk)
         print_success(f"Data exported to {path}")
-        console.print(f"  Foods: {len(data['foods'])}")
-        console.print(f"  Meal logs: {len(data['meal_logs'])}")
-        console.print(f"  Off days: {len(data['off_days'])}")
-        console.print(f"  Weight entries: {len(data['weight_history'])}")
+        print_backup_counts(counts)
     except Exception as e:
         print_error(f"Export failed: {e}")
 
     press_enter_to_continue()
 
 
+IMPORT_MODE_CHOICES = ["1", "2"]
+
+
 def import_data_menu():
     """Import data from JSON file."""
-    import json
-    from pathlib import Path
 
     print_header("Import Data")
 
@@ -925,22 +1053,18 @@ def import_data_menu():
         return
 
     try:
-        with open(path, 'r') as f:
-            data = json.load(f)
+        data = orjson.loads(path.read_bytes())
 
+        # The parsed backup is reused for the import, so it is only decoded once
         console.print(f"\nFile contains:")
-        console.print(f"  Foods: {len(data.get('foods', []))}")
-        console.print(f"  Meal logs: {len(data.get('meal_logs', []))}")
-        console.print(f"  Off days: {len(data.get('off_days', []))}")
-        console.print(f"  Weight entries: {len(data.get('weight_history', []))}")
-        console.print(f"  Exported at: {data.get('exported_at', 'Unknown')}")
-        console.print()
+        print_backup_counts({table: len(data.get(table, [])) for table in BACKUP_TABLES})
+        console.print(f"  Exported at: {data.get('exported_at', 'Unknown')}\n", markup=False)
 
         console.print("Import mode:")
         console.print("  [1] Replace all data (clears existing)")
         console.print("  [2] Merge with existing data")
 
-        mode = Prompt.ask("Choice", choices=["1", "2"], default="2")
+        mode = Prompt.ask("Choice", choices=IMPORT_MODE_CHOICES, default="2")
         merge = mode == "2"
 
         if not merge:
@@ -950,7 +1074,7 @@ def import_data_menu():
         db.import_data(data, merge=merge)
         print_success("Data imported successfully!")
 
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         print_error("Invalid JSON file.")
     except Exception as e:
         print_error(f"Import failed: {e}")
@@ -960,84 +1084,79 @@ def import_data_menu():
 
 # ============== Main Menu ==============
 
+# Built once; only the "Today" stats line changes between redraws
+MAIN_PANEL = Panel(
+    Text.assemble(("Food Tracker", "bold cyan"), "\n", ("Track your nutrition and reach your goals", "dim")),
+    box=box.DOUBLE
+)
+MAIN_MENU = Text(
+    "  [1] Log Meal\n"
+    "  [2] View Today's Meals\n"
+    "  [3] Dashboard\n"
+    "  [4] Analytics\n"
+    "  [5] Manage Foods\n"
+    "  [6] Quick Add (Favorites)\n"
+    "  [7] Settings\n"
+    "  [0] Exit\n"
+)
+MAIN_CHOICES = ["0", "1", "2", "3", "4", "5", "6", "7"]
+
+
 def main_menu():
     """Display and handle main menu."""
     while True:
         clear_screen()
-        console.print(Panel(
-            "[bold cyan]Food Tracker[/bold cyan]\n[dim]Track your nutrition and reach your goals[/dim]",
-            box=box.DOUBLE
-        ))
 
-        # Quick stats
+        # Quick stats; the whole frame goes out in a single print
         progress = logic.calculate_daily_progress()
         cals = progress['totals']['calories']
         target = progress['targets']['calories']
-        console.print(f"[dim]Today: {cals:.0f} / {target} calories ({progress['percentage']['calories']:.0f}%)[/dim]")
-        console.print()
+        stats = Text(f"Today: {cals:.0f} / {target} calories ({progress['percentage']['calories']:.0f}%)",
+                     style="dim")
+        console.print(Group(MAIN_PANEL, stats, Text(), MAIN_MENU))
 
-        console.print("  [1] Log Meal")
-        console.print("  [2] View Today's Meals")
-        console.print("  [3] Dashboard")
-        console.print("  [4] Analytics")
-        console.print("  [5] Manage Foods")
-        console.print("  [6] Quick Add (Favorites)")
-        console.print("  [7] Settings")
-        console.print("  [0] Exit")
-        console.print()
-
-        choice = Prompt.ask("Choice", choices=["0", "1", "2", "3", "4", "5", "6", "7"], default="1")
+        choice = Prompt.ask("Choice", choices=MAIN_CHOICES, default="1")
 
         if choice == "0":
             console.print("[cyan]Goodbye! Keep tracking![/cyan]")
             break
-        elif choice == "1":
-            log_meal_menu()
-        elif choice == "2":
-            view_today_meals()
-            press_enter_to_continue()
-        elif choice == "3":
-            display_dashboard()
-        elif choice == "4":
-            analytics_menu()
-        elif choice == "5":
-            foods_menu()
-        elif choice == "6":
-            quick_add_menu()
-        elif choice == "7":
-            settings_menu()
+        MAIN_ACTIONS[choice]()
+
+
+def view_today_meals_and_wait():
+    """View today's meals, then wait for Enter."""
+    view_today_meals()
+    press_enter_to_continue()
+
+
+FOODS_MENU = Text(
+    "  [1] Add New Food\n"
+    "  [2] Search Foods\n"
+    "  [3] View Favorites\n"
+    "  [4] Recent Foods\n"
+    "  [0] Back\n"
+)
+FOODS_CHOICES = ["0", "1", "2", "3", "4"]
+FOODS_FRAME = Group(header_text("Manage Foods"), FOODS_MENU)
 
 
 def foods_menu():
     """Foods management submenu."""
     while True:
         clear_screen()
-        print_header("Manage Foods")
-
-        console.print("  [1] Add New Food")
-        console.print("  [2] Search Foods")
-        console.print("  [3] View Favorites")
-        console.print("  [4] Recent Foods")
-        console.print("  [0] Back")
-        console.print()
+        console.print(FOODS_FRAME)
 
-        choice = Prompt.ask("Choice", choices=["0", "1", "2", "3", "4"], default="0")
+        choice = Prompt.ask("Choice", choices=FOODS_CHOICES, default="0")
 
         if choice == "0":
             break
-        elif choice == "1":
-            add_food_menu()
-            press_enter_to_continue()
-        elif choice == "2":
-            search_foods_menu()
-            press_enter_to_continue()
-        elif choice == "3":
-            view_favorites_menu()
-            press_enter_to_continue()
-        elif choice == "4":
-            foods = db.get_recent_foods(20)
-            display_food_table(foods)
-            press_enter_to_continue()
+        FOODS_ACTIONS[choice]()
+        press_enter_to_continue()
+
+
+def view_recent_foods():
+    """Display the most recently logged foods."""
+    display_food_table(db.get_recent_foods(20))
 
 
 def quick_add_menu():
@@ -1052,24 +1171,23 @@ def quick_add_menu():
 
     display_food_table(favorites)
 
-    food_id = IntPrompt.ask("\nSelect food ID (0 to cancel)", default=0)
+    food_id = ask_int("\nSelect food ID (0 to cancel)", default=0)
     if food_id == 0:
         return
 
-    food = db.get_food(food_id)
+    # The favorites are already loaded, so look the pick up locally;
+    # IDs that are not favorites still go to the database, as before
+    by_id = {f['id']: f for f in favorites}
+    food = by_id.get(food_id) or db.get_food(food_id)
     if not food:
         print_error("Food not found.")
         press_enter_to_continue()
         return
 
-    portions = FloatPrompt.ask("Portions", default=1.0)
-
-    console.print("\nMeal type:")
-    for i, meal_type in enumerate(logic.MEAL_TYPES, 1):
-        console.print(f"  [{i}] {meal_type.capitalize()}")
+    portions = ask_float("Portions", default=1.0)
 
-    meal_choice = Prompt.ask("Choice", choices=["1", "2", "3", "4"], default="1")
-    meal_type = logic.MEAL_TYPES[int(meal_choice) - 1]
+    console.print()
+    meal_type = ask_meal_type()
 
     try:
         db.log_meal(food['id'], portions, meal_type)
@@ -1081,6 +1199,24 @@ def quick_add_menu():
     press_enter_to_continue()
 
 
+# Menu dispatch tables ("0" is handled by each loop as back/exit)
+MAIN_ACTIONS = {
+    "1": log_meal_menu,
+    "2": view_today_meals_and_wait,
+    "3": display_dashboard,
+    "4": analytics_menu,
+    "5": foods_menu,
+    "6": quick_add_menu,
+    "7": settings_menu,
+}
+FOODS_ACTIONS = {
+    "1": add_food_menu,
+    "2": search_foods_menu,
+    "3": view_favorites_menu,
+    "4": view_recent_foods,
+}
+
+
 def run():
     """Entry point for the CLI."""
     try:
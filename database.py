@@ -3,18 +3,39 @@ Database module for Food Tracker.
 Handles PostgreSQL database setup and CRUD operations.
 """
 
+import io
+import itertools
 import os
+import queue
+import time
+import orjson
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from datetime import datetime, date
+import psycopg2.errors
+import psycopg2.extensions
+from psycopg2.extras import RealDictCursor, execute_values
+from contextlib import contextmanager
+from datetime import datetime, date, timedelta
 from typing import Optional, List
 from urllib.parse import urlparse
 
 # Get database URL from environment variable
 DATABASE_URL = os.environ.get('DATABASE_URL', 'postgresql://localhost/food_tracker')
 
+# Idle connections kept per process; should match the number of worker threads
+POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))
+
+# Pooled connections idle for longer than this are pinged before reuse, so one
+# dropped by a server restart or an idle timeout is replaced, not handed out
+POOL_PING_AFTER_SECONDS = float(os.environ.get('DB_POOL_PING_AFTER_SECONDS', 1))
+
+# Commit durability for app connections. 'on' waits for the WAL flush, so a
+# logged meal survives a server crash. Setting 'off' lets commits return before
+# the flush: faster, but a crash can lose the last few commits (never corrupts
+# data). Bulk imports always turn it off for their own transaction.
+SYNCHRONOUS_COMMIT = os.environ.get('DB_SYNCHRONOUS_COMMIT', 'on')
+
 # Foods data for auto-import on first run
-FOODS_DATA = [
+FOODS_DATA = (
     # Protein products
     ("Müllermilch Protein Shake Schoko-Coco", 248, 26, 20.4, 6.8),
     ("Rewe Chocolate Protein Ice Cream", 132, 9.4, 17.7, 2.7),
@@ -76,148 +97,340 @@ FOODS_DATA = [
     ("Pesto Verde", 522, 4.5, 6.7, 44),
     # Fast food
     ("Five Guys", 610, 18, 39, 32),
-]
+)
+
+
+_pool = queue.LifoQueue(maxsize=POOL_SIZE)
+
+
+# Bumped on every commit in this process so callers can tell when cached
+# reads may be stale
+data_version = 0
+_commit_counter = itertools.count(1)
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    """Connection whose close() hands it back to the pool for reuse."""
+
+    prepared = False
+    returned_at = 0.0
+
+    def prepare_statements(self):
+        """PREPARE the hot queries for this session, once its tables exist.
+
+        Runs outside a transaction, so it needs no commit (and does not bump
+        data_version); must be called while no transaction is open.
+        """
+        if self.prepared:
+            return
+        self.autocommit = True
+        try:
+            self.cursor().execute(PREPARED_STATEMENTS_SQL)
+            self.prepared = True
+        except psycopg2.errors.UndefinedTable:
+            pass  # Fresh database: init_database prepares once it has the schema
+        finally:
+            self.autocommit = False
+
+    def ping(self):
+        """Round-trip a trivial query, raising psycopg2.Error if the link is dead."""
+        self.autocommit = True
+        try:
+            self.cursor().execute("SELECT 1")
+        finally:
+            if not self.closed:
+                self.autocommit = False
+
+    def commit(self):
+        global data_version
+        super().commit()
+        data_version = next(_commit_counter)
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            status = self.info.transaction_status
+            if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                raise psycopg2.InterfaceError('connection is broken')
+            if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                self.rollback()
+            self.returned_at = time.monotonic()
+            _pool.put_nowait(self)
+        except (psycopg2.Error, queue.Full):
+            super().close()
+
+
+def _close_idle_connections():
+    """Really close pooled connections so a forked child never shares a socket."""
+    while True:
+        try:
+            conn = _pool.get_nowait()
+        except queue.Empty:
+            return
+        psycopg2.extensions.connection.close(conn)
+
+
+# With gunicorn --preload the app (and init_database) is loaded once in the
+# master, which then forks the workers
+os.register_at_fork(before=_close_idle_connections)
+
+# Render hands out postgres:// URLs; libpq wants postgresql://
+_CONNECT_URL = (DATABASE_URL.replace('postgres://', 'postgresql://', 1)
+                if DATABASE_URL.startswith('postgres://') else DATABASE_URL)
+_CONNECT_KWARGS = {
+    'cursor_factory': RealDictCursor,
+    'connection_factory': PooledConnection,
+    # Session settings go in the startup packet, so they cost no extra round trip
+    'options': f'-c synchronous_commit={SYNCHRONOUS_COMMIT}',
+}
 
 
 def get_connection():
-    """Get a database connection using DATABASE_URL."""
-    # Handle Render's postgres:// URL (needs to be postgresql://)
-    url = DATABASE_URL
-    if url.startswith('postgres://'):
-        url = url.replace('postgres://', 'postgresql://', 1)
+    """Get a database connection using DATABASE_URL.
 
-    conn = psycopg2.connect(url, cursor_factory=RealDictCursor)
+    Connections are reused from a per-process pool; calling close() on
+    them rolls back any uncommitted work and returns them to the pool.
+    Ones idle for over POOL_PING_AFTER_SECONDS are pinged first and replaced
+    if the server has dropped them. Prefer `with connection()`, which closes
+    even when the body raises.
+    """
+    while True:
+        try:
+            conn = _pool.get_nowait()
+        except queue.Empty:
+            break
+        if conn.closed:
+            continue
+        if time.monotonic() - conn.returned_at < POOL_PING_AFTER_SECONDS:
+            return conn
+        try:
+            conn.ping()
+            return conn
+        except psycopg2.Error:
+            psycopg2.extensions.connection.close(conn)
+
+    conn = psycopg2.connect(_CONNECT_URL, **_CONNECT_KWARGS)
+    conn.prepare_statements()
     return conn
 
 
-def init_database():
-    """Initialize the database with all required tables."""
+@contextmanager
+def connection():
+    """Borrow a pooled connection, returning it to the pool even on errors."""
     conn = get_connection()
-    cursor = conn.cursor()
+    try:
+        yield conn
+    finally:
+        conn.close()
 
-    # Foods table - stores all food items with nutritional info
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS foods (
-            id SERIAL PRIMARY KEY,
-            name TEXT NOT NULL UNIQUE,
-            calories REAL NOT NULL,
-            protein REAL NOT NULL DEFAULT 0,
-            carbs REAL NOT NULL DEFAULT 0,
-            fats REAL NOT NULL DEFAULT 0,
-            serving_size TEXT DEFAULT '1 serving',
-            is_favorite INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    # Meal logs table - records of meals eaten
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS meal_logs (
-            id SERIAL PRIMARY KEY,
-            food_id INTEGER NOT NULL,
-            portions REAL NOT NULL DEFAULT 1.0,
-            meal_type TEXT NOT NULL,
-            logged_at TIMESTAMP NOT NULL,
-            notes TEXT,
-            FOREIGN KEY (food_id) REFERENCES foods(id) ON DELETE CASCADE
-        )
-    """)
-
-    # User settings table - stores user preferences and goals
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS settings (
-            key TEXT PRIMARY KEY,
-            value TEXT NOT NULL
-        )
-    """)
 
-    # Off days table - tracks days not counted
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS off_days (
-            id SERIAL PRIMARY KEY,
-            date DATE NOT NULL UNIQUE,
-            reason TEXT NOT NULL,
-            notes TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    # Weight history table - tracks weight over time
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS weight_history (
-            id SERIAL PRIMARY KEY,
-            weight REAL NOT NULL,
-            recorded_at DATE NOT NULL UNIQUE,
-            notes TEXT
-        )
-    """)
-
-    # Meals table - groups multiple ingredients into a single meal
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS meals (
-            id SERIAL PRIMARY KEY,
-            name TEXT,
-            meal_type TEXT NOT NULL,
-            logged_at TIMESTAMP NOT NULL,
-            total_calories REAL DEFAULT 0,
-            total_protein REAL DEFAULT 0,
-            total_carbs REAL DEFAULT 0,
-            total_fats REAL DEFAULT 0,
-            notes TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    # Meal ingredients table - links foods to meals with amounts
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS meal_ingredients (
-            id SERIAL PRIMARY KEY,
-            meal_id INTEGER NOT NULL,
-            food_id INTEGER NOT NULL,
-            amount_grams REAL NOT NULL DEFAULT 100,
-            calories REAL NOT NULL,
-            protein REAL NOT NULL,
-            carbs REAL NOT NULL,
-            fats REAL NOT NULL,
-            FOREIGN KEY (meal_id) REFERENCES meals(id) ON DELETE CASCADE,
-            FOREIGN KEY (food_id) REFERENCES foods(id) ON DELETE CASCADE
-        )
-    """)
-
-    conn.commit()
-
-    # Insert default settings if not exists
-    default_settings = [
-        ('goal_type', 'maintenance'),
-        ('daily_calorie_target', '2000'),
-        ('protein_target', '150'),
-        ('carbs_target', '200'),
-        ('fats_target', '65'),
-    ]
-
-    for key, value in default_settings:
-        cursor.execute("""
-            INSERT INTO settings (key, value) VALUES (%s, %s)
-            ON CONFLICT (key) DO NOTHING
-        """, (key, value))
+# Hot queries, prepared once per pooled connection so the server skips parsing
+# and planning on every call; run them with EXECUTE name(args)
+PREPARED_STATEMENTS_SQL = """
+    PREPARE food_by_id(int) AS
+        SELECT * FROM foods WHERE id = $1;
+
+    -- $1/$2: half-open [start, end) bounds from _day_range
+    PREPARE meals_for_day(timestamp, timestamp) AS
+        SELECT
+            ml.id as log_id,
+            ml.portions,
+            ml.meal_type,
+            ml.logged_at,
+            ml.notes,
+            f.id as food_id,
+            f.name,
+            f.calories,
+            f.protein,
+            f.carbs,
+            f.fats,
+            f.serving_size,
+            f.is_favorite
+        FROM meal_logs ml
+        JOIN foods f ON ml.food_id = f.id
+        WHERE ml.logged_at >= $1 AND ml.logged_at < $2
+        ORDER BY ml.logged_at ASC;
 
-    conn.commit()
+    PREPARE daily_totals(timestamp, timestamp) AS
+        SELECT
+            COALESCE(SUM(calories), 0)::float8 as calories,
+            COALESCE(SUM(protein), 0)::float8 as protein,
+            COALESCE(SUM(carbs), 0)::float8 as carbs,
+            COALESCE(SUM(fats), 0)::float8 as fats,
+            COUNT(*) as meal_count
+        FROM (
+            SELECT
+                round((f.calories * ml.portions)::numeric, 2) as calories,
+                round((f.protein * ml.portions)::numeric, 2) as protein,
+                round((f.carbs * ml.portions)::numeric, 2) as carbs,
+                round((f.fats * ml.portions)::numeric, 2) as fats
+            FROM meal_logs ml
+            JOIN foods f ON ml.food_id = f.id
+            WHERE ml.logged_at >= $1 AND ml.logged_at < $2
+            UNION ALL
+            SELECT total_calories::numeric, total_protein::numeric,
+                   total_carbs::numeric, total_fats::numeric
+            FROM meals
+            WHERE logged_at >= $1 AND logged_at < $2
+        ) day_meals;
+"""
 
-    # Auto-import foods if the table is empty
-    cursor.execute("SELECT COUNT(*) as count FROM foods")
-    result = cursor.fetchone()
-    if result['count'] == 0:
-        print("Importing default foods...")
-        for name, calories, protein, carbs, fats in FOODS_DATA:
-            cursor.execute("""
+
+# All tables and indexes, sent to the server as one multi-statement query
+SCHEMA_SQL = """
+    -- Foods table - stores all food items with nutritional info
+    CREATE TABLE IF NOT EXISTS foods (
+        id SERIAL PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE,
+        calories REAL NOT NULL,
+        protein REAL NOT NULL DEFAULT 0,
+        carbs REAL NOT NULL DEFAULT 0,
+        fats REAL NOT NULL DEFAULT 0,
+        serving_size TEXT DEFAULT '1 serving',
+        is_favorite INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- Meal logs table - records of meals eaten
+    CREATE TABLE IF NOT EXISTS meal_logs (
+        id SERIAL PRIMARY KEY,
+        food_id INTEGER NOT NULL,
+        portions REAL NOT NULL DEFAULT 1.0,
+        meal_type TEXT NOT NULL,
+        logged_at TIMESTAMP NOT NULL,
+        notes TEXT,
+        FOREIGN KEY (food_id) REFERENCES foods(id) ON DELETE CASCADE
+    );
+
+    -- User settings table - stores user preferences and goals
+    CREATE TABLE IF NOT EXISTS settings (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+
+    -- Off days table - tracks days not counted
+    CREATE TABLE IF NOT EXISTS off_days (
+        id SERIAL PRIMARY KEY,
+        date DATE NOT NULL UNIQUE,
+        reason TEXT NOT NULL,
+        notes TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- Weight history table - tracks weight over time
+    CREATE TABLE IF NOT EXISTS weight_history (
+        id SERIAL PRIMARY KEY,
+        weight REAL NOT NULL,
+        recorded_at DATE NOT NULL UNIQUE,
+        notes TEXT
+    );
+
+    -- Meals table - groups multiple ingredients into a single meal
+    CREATE TABLE IF NOT EXISTS meals (
+        id SERIAL PRIMARY KEY,
+        name TEXT,
+        meal_type TEXT NOT NULL,
+        logged_at TIMESTAMP NOT NULL,
+        total_calories REAL DEFAULT 0,
+        total_protein REAL DEFAULT 0,
+        total_carbs REAL DEFAULT 0,
+        total_fats REAL DEFAULT 0,
+        notes TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- Meal ingredients table - links foods to meals with amounts
+    CREATE TABLE IF NOT EXISTS meal_ingredients (
+        id SERIAL PRIMARY KEY,
+        meal_id INTEGER NOT NULL,
+        food_id INTEGER NOT NULL,
+        amount_grams REAL NOT NULL DEFAULT 100,
+        calories REAL NOT NULL,
+        protein REAL NOT NULL,
+        carbs REAL NOT NULL,
+        fats REAL NOT NULL,
+        FOREIGN KEY (meal_id) REFERENCES meals(id) ON DELETE CASCADE,
+        FOREIGN KEY (food_id) REFERENCES foods(id) ON DELETE CASCADE
+    );
+
+    -- Indexes for the date-range lookups and the foreign keys used in joins
+    -- and cascading deletes (off_days.date is already indexed by its UNIQUE)
+    CREATE INDEX IF NOT EXISTS idx_meal_logs_logged_at ON meal_logs(logged_at);
+    CREATE INDEX IF NOT EXISTS idx_meal_logs_food_id ON meal_logs(food_id);
+    CREATE INDEX IF NOT EXISTS idx_meals_logged_at ON meals(logged_at);
+    CREATE INDEX IF NOT EXISTS idx_meal_ingredients_meal_id ON meal_ingredients(meal_id);
+    CREATE INDEX IF NOT EXISTS idx_meal_ingredients_food_id ON meal_ingredients(food_id);
+"""
+
+
+# Recorded as a comment on the foods table once init_database has run; bump
+# SCHEMA_VERSION whenever SCHEMA_SQL or init_database gains new DDL
+SCHEMA_VERSION = 2
+SCHEMA_MARK = f'food-tracker schema v{SCHEMA_VERSION}'
+
+
+def init_database():
+    """Initialize the database with all required tables.
+
+    The DDL is skipped when the schema mark shows this version already ran;
+    default settings and foods are still seeded if they are missing.
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+
+        # obj_description() is NULL when the table (or its comment) is missing
+        cursor.execute("SELECT obj_description(to_regclass('foods'), 'pg_class') AS mark")
+        schema_current = cursor.fetchone()['mark'] == SCHEMA_MARK
+
+        if not schema_current:
+            cursor.execute(SCHEMA_SQL)
+
+            # Trigram index so search_foods' ILIKE '%query%' need not scan every food.
+            # Creating the extension can need privileges the app role lacks; search
+            # then keeps working, just without the index.
+            cursor.execute("SAVEPOINT trgm")
+            try:
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_foods_name_trgm
+                    ON foods USING gin (name gin_trgm_ops)
+                """)
+            except psycopg2.Error:
+                cursor.execute("ROLLBACK TO SAVEPOINT trgm")
+            else:
+                cursor.execute("RELEASE SAVEPOINT trgm")
+
+        # Insert default settings if not exists
+        default_settings = [
+            ('goal_type', 'maintenance'),
+            ('daily_calorie_target', '2000'),
+            ('protein_target', '150'),
+            ('carbs_target', '200'),
+            ('fats_target', '65'),
+        ]
+
+        execute_values(cursor, """
+            INSERT INTO settings (key, value) VALUES %s
+            ON CONFLICT (key) DO NOTHING
+        """, default_settings)
+
+        # Auto-import foods if the table is empty
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM foods) AS has_foods")
+        if not cursor.fetchone()['has_foods']:
+            print("Importing default foods...")
+            execute_values(cursor, """
                 INSERT INTO foods (name, calories, protein, carbs, fats, serving_size)
-                VALUES (%s, %s, %s, %s, %s, %s)
+                VALUES %s
                 ON CONFLICT (name) DO NOTHING
-            """, (name, calories, protein, carbs, fats, '100g'))
-        conn.commit()
-        print(f"Imported {len(FOODS_DATA)} foods.")
+            """, ((*food, '100g') for food in FOODS_DATA), page_size=IMPORT_PAGE_SIZE)
+            print(f"Imported {len(FOODS_DATA)} foods.")
 
-    conn.close()
+        # Tables, defaults and the mark are committed together
+        if not schema_current:
+            cursor.execute("COMMENT ON TABLE foods IS %s", (SCHEMA_MARK,))
+        conn.commit()
+        conn.prepare_statements()
 
 
 # ============== Food Operations ==============
@@ -225,16 +438,15 @@ def init_database():
 def add_food(name: str, calories: float, protein: float = 0,
              carbs: float = 0, fats: float = 0, serving_size: str = "1 serving") -> int:
     """Add a new food to the database. Returns the food ID."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO foods (name, calories, protein, carbs, fats, serving_size)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        RETURNING id
-    """, (name, calories, protein, carbs, fats, serving_size))
-    food_id = cursor.fetchone()['id']
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO foods (name, calories, protein, carbs, fats, serving_size)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            RETURNING id
+        """, (name, calories, protein, carbs, fats, serving_size))
+        food_id = cursor.fetchone()['id']
+        conn.commit()
     return food_id
 
 
@@ -242,121 +454,112 @@ def update_food(food_id: int, name: str = None, calories: float = None,
                 protein: float = None, carbs: float = None, fats: float = None,
                 serving_size: str = None) -> bool:
     """Update an existing food. Returns True if successful."""
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    updates = []
-    values = []
-
-    if name is not None:
-        updates.append("name = %s")
-        values.append(name)
-    if calories is not None:
-        updates.append("calories = %s")
-        values.append(calories)
-    if protein is not None:
-        updates.append("protein = %s")
-        values.append(protein)
-    if carbs is not None:
-        updates.append("carbs = %s")
-        values.append(carbs)
-    if fats is not None:
-        updates.append("fats = %s")
-        values.append(fats)
-    if serving_size is not None:
-        updates.append("serving_size = %s")
-        values.append(serving_size)
-
-    if not updates:
-        conn.close()
-        return False
-
-    values.append(food_id)
-    query = f"UPDATE foods SET {', '.join(updates)} WHERE id = %s"
-    cursor.execute(query, values)
-    success = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+
+        updates = []
+        values = []
+
+        if name is not None:
+            updates.append("name = %s")
+            values.append(name)
+        if calories is not None:
+            updates.append("calories = %s")
+            values.append(calories)
+        if protein is not None:
+            updates.append("protein = %s")
+            values.append(protein)
+        if carbs is not None:
+            updates.append("carbs = %s")
+            values.append(carbs)
+        if fats is not None:
+            updates.append("fats = %s")
+            values.append(fats)
+        if serving_size is not None:
+            updates.append("serving_size = %s")
+            values.append(serving_size)
+
+        if not updates:
+            return False
+
+        values.append(food_id)
+        query = f"UPDATE foods SET {', '.join(updates)} WHERE id = %s"
+        cursor.execute(query, values)
+        success = cursor.rowcount > 0
+        conn.commit()
     return success
 
 
 def delete_food(food_id: int) -> bool:
     """Delete a food from the database. Returns True if successful."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM foods WHERE id = %s", (food_id,))
-    success = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM foods WHERE id = %s", (food_id,))
+        success = cursor.rowcount > 0
+        conn.commit()
     return success
 
 
 def get_food(food_id: int) -> Optional[dict]:
     """Get a single food by ID."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM foods WHERE id = %s", (food_id,))
-    row = cursor.fetchone()
-    conn.close()
-    return dict(row) if row else None
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("EXECUTE food_by_id(%s)", (food_id,))
+        row = cursor.fetchone()
+    return row
 
 
 def search_foods(query: str, limit: int = 20) -> List[dict]:
     """Search foods by name. Returns list of matching foods."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT * FROM foods
-        WHERE name ILIKE %s
-        ORDER BY is_favorite DESC, name ASC
-        LIMIT %s
-    """, (f"%{query}%", limit))
-    results = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT * FROM foods
+            WHERE name ILIKE '%%' || %s || '%%'
+            ORDER BY is_favorite DESC, name ASC
+            LIMIT %s
+        """, (query, limit))
+        results = cursor.fetchall()
     return results
 
 
 def get_all_foods(limit: int = 100) -> List[dict]:
     """Get all foods, ordered by favorites first then name."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT * FROM foods
-        ORDER BY is_favorite DESC, name ASC
-        LIMIT %s
-    """, (limit,))
-    results = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT * FROM foods
+            ORDER BY is_favorite DESC, name ASC
+            LIMIT %s
+        """, (limit,))
+        results = cursor.fetchall()
     return results
 
 
 def get_favorite_foods() -> List[dict]:
     """Get all favorite foods."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT * FROM foods
-        WHERE is_favorite = 1
-        ORDER BY name ASC
-    """)
-    results = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT * FROM foods
+            WHERE is_favorite = 1
+            ORDER BY name ASC
+        """)
+        results = cursor.fetchall()
     return results
 
 
 def toggle_favorite(food_id: int) -> bool:
     """Toggle the favorite status of a food. Returns new favorite status."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        UPDATE foods SET is_favorite = CASE WHEN is_favorite = 1 THEN 0 ELSE 1 END
-        WHERE id = %s
-    """, (food_id,))
-    conn.commit()
-
-    cursor.execute("SELECT is_favorite FROM foods WHERE id = %s", (food_id,))
-    row = cursor.fetchone()
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE foods SET is_favorite = CASE WHEN is_favorite = 1 THEN 0 ELSE 1 END
+            WHERE id = %s
+            RETURNING is_favorite
+        """, (food_id,))
+        row = cursor.fetchone()
+        conn.commit()
     return bool(row['is_favorite']) if row else False
 
 
@@ -368,135 +571,197 @@ def log_meal(food_id: int, portions: float, meal_type: str,
     if logged_at is None:
         logged_at = datetime.now()
 
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO meal_logs (food_id, portions, meal_type, logged_at, notes)
-        VALUES (%s, %s, %s, %s, %s)
-        RETURNING id
-    """, (food_id, portions, meal_type, logged_at, notes))
-    log_id = cursor.fetchone()['id']
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO meal_logs (food_id, portions, meal_type, logged_at, notes)
+            VALUES (%s, %s, %s, %s, %s)
+            RETURNING id
+        """, (food_id, portions, meal_type, logged_at, notes))
+        log_id = cursor.fetchone()['id']
+        conn.commit()
     return log_id
 
 
 def delete_meal_log(log_id: int) -> bool:
     """Delete a meal log. Returns True if successful."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM meal_logs WHERE id = %s", (log_id,))
-    success = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM meal_logs WHERE id = %s", (log_id,))
+        success = cursor.rowcount > 0
+        conn.commit()
     return success
 
 
+def _day_range(start_date: date, end_date: date = None) -> tuple:
+    """Half-open [start, end + 1 day) bounds covering whole days of logged_at.
+
+    Comparing the raw timestamp (rather than DATE(logged_at)) lets the
+    logged_at indexes serve the lookup.
+    """
+    return start_date, (end_date or start_date) + timedelta(days=1)
+
+
+def _fetch_meals_for_date(cursor, target_date: date) -> List[dict]:
+    """Run the meals-for-date query on an open cursor."""
+    cursor.execute("EXECUTE meals_for_day(%s, %s)", _day_range(target_date))
+    return cursor.fetchall()
+
+
 def get_meals_for_date(target_date: date) -> List[dict]:
     """Get all meals logged for a specific date with food details."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT
-            ml.id as log_id,
-            ml.portions,
-            ml.meal_type,
-            ml.logged_at,
-            ml.notes,
-            f.id as food_id,
-            f.name,
-            f.calories,
-            f.protein,
-            f.carbs,
-            f.fats,
-            f.serving_size,
-            f.is_favorite
-        FROM meal_logs ml
-        JOIN foods f ON ml.food_id = f.id
-        WHERE DATE(ml.logged_at) = %s
-        ORDER BY ml.logged_at ASC
-    """, (target_date,))
-    results = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        results = _fetch_meals_for_date(cursor, target_date)
     return results
 
 
 def get_meals_for_date_range(start_date: date, end_date: date) -> List[dict]:
     """Get all meals in a date range with food details."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT
-            ml.id as log_id,
-            ml.portions,
-            ml.meal_type,
-            ml.logged_at,
-            ml.notes,
-            f.id as food_id,
-            f.name,
-            f.calories,
-            f.protein,
-            f.carbs,
-            f.fats,
-            f.serving_size
-        FROM meal_logs ml
-        JOIN foods f ON ml.food_id = f.id
-        WHERE DATE(ml.logged_at) BETWEEN %s AND %s
-        ORDER BY ml.logged_at ASC
-    """, (start_date, end_date))
-    results = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT
+                ml.id as log_id,
+                ml.portions,
+                ml.meal_type,
+                ml.logged_at,
+                ml.logged_at::date::text as logged_date,
+                ml.notes,
+                f.id as food_id,
+                f.name,
+                f.calories,
+                f.protein,
+                f.carbs,
+                f.fats,
+                f.serving_size
+            FROM meal_logs ml
+            JOIN foods f ON ml.food_id = f.id
+            WHERE ml.logged_at >= %s AND ml.logged_at < %s
+            ORDER BY ml.logged_at ASC
+        """, _day_range(start_date, end_date))
+        results = cursor.fetchall()
+    return results
+
+
+def _fetch_daily_totals(cursor, target_date: date) -> dict:
+    """Run the daily totals rollup on an open cursor."""
+    cursor.execute("EXECUTE daily_totals(%s, %s)", _day_range(target_date))
+    return cursor.fetchone()
+
+
+def get_daily_totals(target_date: date) -> dict:
+    """Get summed nutrition for a date across single logs and multi-ingredient meals."""
+    with connection() as conn:
+        cursor = conn.cursor()
+        totals = _fetch_daily_totals(cursor, target_date)
+    return totals
+
+
+def get_logged_dates(start_date: date, end_date: date) -> set:
+    """Get the ISO dates in a range that have at least one single-food log."""
+    with connection() as conn:
+        cursor = conn.cursor()
+        start, end = _day_range(start_date, end_date)
+        cursor.execute("""
+            SELECT DISTINCT logged_at::date::text as day
+            FROM meal_logs
+            WHERE logged_at >= %s AND logged_at < %s
+        """, (start, end))
+        results = {row['day'] for row in cursor.fetchall()}
+    return results
+
+
+def get_daily_nutrition_totals(start_date: date, end_date: date) -> dict:
+    """
+    Get summed nutrition per day across single logs and multi-ingredient meals.
+    Returns {iso_date: {'calories', 'protein', 'carbs', 'fats'}} in date order,
+    with only the days that have something logged.
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+        start, end = _day_range(start_date, end_date)
+        cursor.execute("""
+            SELECT
+                day_meals.day::text as day,
+                SUM(calories)::float8 as calories,
+                SUM(protein)::float8 as protein,
+                SUM(carbs)::float8 as carbs,
+                SUM(fats)::float8 as fats
+            FROM (
+                SELECT
+                    ml.logged_at::date as day,
+                    round((f.calories * ml.portions)::numeric, 2) as calories,
+                    round((f.protein * ml.portions)::numeric, 2) as protein,
+                    round((f.carbs * ml.portions)::numeric, 2) as carbs,
+                    round((f.fats * ml.portions)::numeric, 2) as fats
+                FROM meal_logs ml
+                JOIN foods f ON ml.food_id = f.id
+                WHERE ml.logged_at >= %(start)s AND ml.logged_at < %(end)s
+                UNION ALL
+                SELECT logged_at::date, total_calories::numeric, total_protein::numeric,
+                       total_carbs::numeric, total_fats::numeric
+                FROM meals
+                WHERE logged_at >= %(start)s AND logged_at < %(end)s
+            ) day_meals
+            GROUP BY day_meals.day
+            ORDER BY day_meals.day
+        """, {'start': start, 'end': end})
+        results = {row.pop('day'): row for row in cursor.fetchall()}
     return results
 
 
 def get_recent_foods(limit: int = 10) -> List[dict]:
     """Get recently logged foods for quick re-add."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT DISTINCT ON (f.id) f.*
-        FROM foods f
-        JOIN meal_logs ml ON f.id = ml.food_id
-        ORDER BY f.id, ml.logged_at DESC
-        LIMIT %s
-    """, (limit,))
-    results = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT DISTINCT ON (f.id) f.*
+            FROM foods f
+            JOIN meal_logs ml ON f.id = ml.food_id
+            ORDER BY f.id, ml.logged_at DESC
+            LIMIT %s
+        """, (limit,))
+        results = cursor.fetchall()
     return results
 
 
 # ============== Settings Operations ==============
 
+# Settings change rarely, so reads are served from a per-process copy. A commit
+# from this process drops it at once; writes from other processes (the other
+# gunicorn workers, the CLI) show up once it expires.
 def get_setting(key: str, default: str = None) -> Optional[str]:
     """Get a setting value."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT value FROM settings WHERE key = %s", (key,))
-    row = cursor.fetchone()
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT value FROM settings WHERE key = %s", (key,))
+        row = cursor.fetchone()
     return row['value'] if row else default
 
 
 def set_setting(key: str, value: str):
     """Set a setting value."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO settings (key, value) VALUES (%s, %s)
-        ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value
-    """, (key, value))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO settings (key, value) VALUES (%s, %s)
+            ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value
+        """, (key, value))
+        conn.commit()
+
+
+def _fetch_all_settings(cursor) -> dict:
+    """Run the all-settings query on an open cursor."""
+    cursor.execute("SELECT key, value FROM settings")
+    return {row['key']: row['value'] for row in cursor.fetchall()}
 
 
 def get_all_settings() -> dict:
     """Get all settings as a dictionary."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT key, value FROM settings")
-    results = {row['key']: row['value'] for row in cursor.fetchall()}
-    conn.close()
-    return results
+    with connection() as conn:
+        settings = _fetch_all_settings(conn.cursor())
+    return settings
 
 
 # ============== Off Days Operations ==============
@@ -514,58 +779,90 @@ OFF_DAY_REASONS = [
 
 def add_off_day(target_date: date, reason: str, notes: str = None) -> int:
     """Add an off day. Returns the off day ID."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO off_days (date, reason, notes)
-        VALUES (%s, %s, %s)
-        ON CONFLICT (date) DO UPDATE SET reason = EXCLUDED.reason, notes = EXCLUDED.notes
-        RETURNING id
-    """, (target_date, reason, notes))
-    off_day_id = cursor.fetchone()['id']
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO off_days (date, reason, notes)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (date) DO UPDATE SET reason = EXCLUDED.reason, notes = EXCLUDED.notes
+            RETURNING id
+        """, (target_date, reason, notes))
+        off_day_id = cursor.fetchone()['id']
+        conn.commit()
     return off_day_id
 
 
 def remove_off_day(target_date: date) -> bool:
     """Remove an off day. Returns True if successful."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM off_days WHERE date = %s", (target_date,))
-    success = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM off_days WHERE date = %s", (target_date,))
+        success = cursor.rowcount > 0
+        conn.commit()
     return success
 
 
-def get_off_day(target_date: date) -> Optional[dict]:
-    """Get off day info for a specific date."""
-    conn = get_connection()
-    cursor = conn.cursor()
+def _fetch_off_day(cursor, target_date: date) -> Optional[dict]:
+    """Run the off-day lookup on an open cursor."""
     cursor.execute("SELECT * FROM off_days WHERE date = %s", (target_date,))
     row = cursor.fetchone()
-    conn.close()
-    return dict(row) if row else None
+    return row
+
+
+def get_off_day(target_date: date) -> Optional[dict]:
+    """Get off day info for a specific date."""
+    with connection() as conn:
+        cursor = conn.cursor()
+        off_day = _fetch_off_day(cursor, target_date)
+    return off_day
 
 
 def get_off_days_in_range(start_date: date, end_date: date) -> List[dict]:
     """Get all off days in a date range."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT * FROM off_days
-        WHERE date BETWEEN %s AND %s
-        ORDER BY date ASC
-    """, (start_date, end_date))
-    results = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT * FROM off_days
+            WHERE date BETWEEN %s AND %s
+            ORDER BY date ASC
+        """, (start_date, end_date))
+        results = cursor.fetchall()
+    return results
+
+
+def get_off_days_map(start_date: date, end_date: date) -> dict:
+    """Get off days in a date range keyed by ISO date string, in date order."""
+    return {row['date'].isoformat(): row
+            for row in get_off_days_in_range(start_date, end_date)}
+
+
+def get_off_day_reason_summary(start_date: date, end_date: date) -> List[dict]:
+    """
+    Get off days in a date range grouped by reason.
+    Each row has 'reason', 'count' and 'dates' (the first three dates as
+    ISO strings), ordered by each reason's first date.
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT reason, COUNT(*) AS count,
+                   (array_agg(date::text ORDER BY date))[1:3] AS dates
+            FROM off_days
+            WHERE date BETWEEN %s AND %s
+            GROUP BY reason
+            ORDER BY MIN(date)
+        """, (start_date, end_date))
+        results = cursor.fetchall()
     return results
 
 
 def is_off_day(target_date: date) -> bool:
     """Check if a date is marked as an off day."""
-    return get_off_day(target_date) is not None
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM off_days WHERE date = %s", (target_date,))
+        found = cursor.fetchone() is not None
+    return found
 
 
 # ============== Weight History Operations ==============
@@ -575,153 +872,221 @@ def log_weight(weight: float, recorded_at: date = None, notes: str = None) -> in
     if recorded_at is None:
         recorded_at = date.today()
 
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO weight_history (weight, recorded_at, notes)
-        VALUES (%s, %s, %s)
-        ON CONFLICT (recorded_at) DO UPDATE SET weight = EXCLUDED.weight, notes = EXCLUDED.notes
-        RETURNING id
-    """, (weight, recorded_at, notes))
-    entry_id = cursor.fetchone()['id']
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO weight_history (weight, recorded_at, notes)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (recorded_at) DO UPDATE SET weight = EXCLUDED.weight, notes = EXCLUDED.notes
+            RETURNING id
+        """, (weight, recorded_at, notes))
+        entry_id = cursor.fetchone()['id']
+        conn.commit()
     return entry_id
 
 
 def get_weight_history(limit: int = 30) -> List[dict]:
     """Get recent weight history entries."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT * FROM weight_history
-        ORDER BY recorded_at DESC
-        LIMIT %s
-    """, (limit,))
-    results = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT * FROM weight_history
+            ORDER BY recorded_at DESC
+            LIMIT %s
+        """, (limit,))
+        results = cursor.fetchall()
     return results
 
 
 def get_latest_weight() -> Optional[dict]:
     """Get the most recent weight entry."""
-    history = get_weight_history(limit=1)
-    return history[0] if history else None
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT * FROM weight_history
+            ORDER BY recorded_at DESC
+            LIMIT 1
+        """)
+        row = cursor.fetchone()
+    return row
 
 
 # ============== Data Export/Import ==============
 
-def export_data() -> dict:
-    """Export all data as a dictionary for backup."""
+EXPORT_BATCH_SIZE = 500
+
+
+def _iter_table(conn, table: str):
+    """Yield rows of a table through a server-side cursor, one batch at a time."""
+    cursor = conn.cursor(name=f'export_{table}')
+    cursor.itersize = EXPORT_BATCH_SIZE
+    cursor.execute(f"SELECT * FROM {table}")
+    yield from cursor
+    cursor.close()
+
+
+def _iter_table_json(conn, table: str):
+    """Yield rows of a table as JSON text built by Postgres, one batch at a time."""
+    cursor = conn.cursor(name=f'export_{table}', cursor_factory=psycopg2.extensions.cursor)
+    cursor.itersize = EXPORT_BATCH_SIZE
+    cursor.execute(f"SELECT row_to_json(t)::text FROM {table} t")
+    for (row,) in cursor:
+        yield row
+    cursor.close()
+
+
+def iter_export(iter_table=_iter_table):
+    """Yield (section, value) pairs of the backup without loading whole tables.
+
+    Table sections yield a row iterator (from iter_table) that must be
+    consumed before moving on to the next section; 'settings' is a dict and
+    'exported_at' a string, the same layout export_data() returns.
+    """
     conn = get_connection()
-    cursor = conn.cursor()
+    try:
+        yield 'foods', iter_table(conn, 'foods')
+        yield 'meal_logs', iter_table(conn, 'meal_logs')
+        yield 'settings', _fetch_all_settings(conn.cursor())
+        yield 'off_days', iter_table(conn, 'off_days')
+        yield 'weight_history', iter_table(conn, 'weight_history')
+        yield 'exported_at', datetime.now().isoformat()
+    finally:
+        conn.close()
+
 
-    data = {
-        'foods': [],
-        'meal_logs': [],
-        'settings': {},
-        'off_days': [],
-        'weight_history': [],
-        'exported_at': datetime.now().isoformat()
-    }
+def iter_export_json(counts: dict = None):
+    """Yield the backup as JSON-encoded byte chunks, one row batch at a time.
 
-    cursor.execute("SELECT * FROM foods")
-    data['foods'] = [dict(row) for row in cursor.fetchall()]
+    Rows arrive already encoded as JSON by Postgres (row_to_json), so they
+    are never turned into dicts here. If counts is given, it is filled with
+    the number of rows per table.
+    """
+    yield b'{'
+    section_sep = b''
+    for name, value in iter_export(_iter_table_json):
+        yield section_sep + orjson.dumps(name) + b':'
+        section_sep = b','
+        if isinstance(value, (dict, str)):
+            yield orjson.dumps(value)
+            continue
+        chunk = [b'[']
+        row_count = 0
+        for row in value:
+            chunk.append(b',' + row.encode() if row_count else row.encode())
+            row_count += 1
+            if len(chunk) >= EXPORT_BATCH_SIZE:
+                yield b''.join(chunk)
+                chunk = []
+        chunk.append(b']')
+        yield b''.join(chunk)
+        if counts is not None:
+            counts[name] = row_count
+    yield b'}'
 
-    cursor.execute("SELECT * FROM meal_logs")
-    data['meal_logs'] = [dict(row) for row in cursor.fetchall()]
 
-    cursor.execute("SELECT key, value FROM settings")
-    data['settings'] = {row['key']: row['value'] for row in cursor.fetchall()}
+def export_data() -> dict:
+    """Export all data as a dictionary for backup.
+
+    Prefer iter_export_json() for writing backups; this loads every table.
+    """
+    return {name: value if isinstance(value, (dict, str)) else list(value)
+            for name, value in iter_export()}
 
-    cursor.execute("SELECT * FROM off_days")
-    data['off_days'] = [dict(row) for row in cursor.fetchall()]
 
-    cursor.execute("SELECT * FROM weight_history")
-    data['weight_history'] = [dict(row) for row in cursor.fetchall()]
+# Rows per INSERT statement during imports (execute_values defaults to 100)
+IMPORT_PAGE_SIZE = 1000
 
-    conn.close()
-    return data
+# Imports switch from batched INSERTs to COPY at this many rows
+COPY_MIN_ROWS = 1000
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def _insert_rows(cursor, table: str, columns: tuple, rows: list):
+    """Insert plain rows (no conflict handling), via COPY when there are many."""
+    if len(rows) < COPY_MIN_ROWS:
+        execute_values(cursor, f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s",
+                       rows, page_size=IMPORT_PAGE_SIZE)
+        return
+
+    # COPY's text format: tab-separated, \N for NULL, backslash escapes
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join('\\N' if value is None else str(value).translate(_COPY_ESCAPES)
+                               for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    cursor.copy_from(buffer, table, columns=columns)
 
 
 def import_data(data: dict, merge: bool = False):
     """Import data from a backup. If merge=False, clears existing data first."""
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    if not merge:
-        cursor.execute("DELETE FROM meal_ingredients")
-        cursor.execute("DELETE FROM meals")
-        cursor.execute("DELETE FROM meal_logs")
-        cursor.execute("DELETE FROM foods")
-        cursor.execute("DELETE FROM off_days")
-        cursor.execute("DELETE FROM weight_history")
-
-    # Import foods
-    for food in data.get('foods', []):
-        if merge:
+    with connection() as conn:
+        cursor = conn.cursor()
+
+        # The whole import is one transaction; don't wait for its WAL flush on
+        # commit (a crash right after could lose the import, never corrupt data)
+        cursor.execute("SET LOCAL synchronous_commit TO OFF")
+
+        if not merge:
             cursor.execute("""
+                TRUNCATE meal_ingredients, meals, meal_logs, foods, off_days, weight_history
+            """)
+
+        # Import foods
+        foods = data.get('foods', [])
+        food_rows = [(food['name'], food['calories'],
+                      food.get('protein', 0), food.get('carbs', 0), food.get('fats', 0),
+                      food.get('serving_size', '1 serving'), food.get('is_favorite', 0))
+                     for food in foods]
+        if merge:
+            execute_values(cursor, """
                 INSERT INTO foods
                 (name, calories, protein, carbs, fats, serving_size, is_favorite)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (name) DO NOTHING
-            """, (food['name'], food['calories'],
-                  food.get('protein', 0), food.get('carbs', 0), food.get('fats', 0),
-                  food.get('serving_size', '1 serving'), food.get('is_favorite', 0)))
+                VALUES %s ON CONFLICT (name) DO NOTHING
+            """, food_rows, page_size=IMPORT_PAGE_SIZE)
         else:
-            cursor.execute("""
-                INSERT INTO foods
-                (name, calories, protein, carbs, fats, serving_size, is_favorite)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (food['name'], food['calories'],
-                  food.get('protein', 0), food.get('carbs', 0), food.get('fats', 0),
-                  food.get('serving_size', '1 serving'), food.get('is_favorite', 0)))
-
-    # Import meal logs - need to look up new food IDs by name
-    for log in data.get('meal_logs', []):
-        # Find the food by looking up in the imported foods
-        food_name = None
-        for food in data.get('foods', []):
-            if food.get('id') == log['food_id']:
-                food_name = food['name']
-                break
-
-        if food_name:
-            cursor.execute("SELECT id FROM foods WHERE name = %s", (food_name,))
-            food_row = cursor.fetchone()
-            if food_row:
-                cursor.execute("""
-                    INSERT INTO meal_logs
-                    (food_id, portions, meal_type, logged_at, notes)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (food_row['id'], log['portions'],
-                      log['meal_type'], log['logged_at'], log.get('notes')))
-
-    # Import settings
-    for key, value in data.get('settings', {}).items():
-        cursor.execute("""
-            INSERT INTO settings (key, value) VALUES (%s, %s)
+            _insert_rows(cursor, 'foods', ('name', 'calories', 'protein', 'carbs', 'fats',
+                                           'serving_size', 'is_favorite'), food_rows)
+
+        # Import meal logs - map backup food IDs to the new IDs by name
+        backup_names = {food.get('id'): food['name'] for food in foods}
+        cursor.execute("SELECT id, name FROM foods WHERE name = ANY(%s)",
+                       (list(backup_names.values()),))
+        food_ids = {row['name']: row['id'] for row in cursor.fetchall()}
+        meal_log_rows = []
+        for log in data.get('meal_logs', []):
+            food_id = food_ids.get(backup_names.get(log['food_id']))
+            if food_id:
+                meal_log_rows.append((food_id, log['portions'], log['meal_type'],
+                                      log['logged_at'], log.get('notes')))
+        _insert_rows(cursor, 'meal_logs',
+                     ('food_id', 'portions', 'meal_type', 'logged_at', 'notes'), meal_log_rows)
+
+        # Import settings
+        execute_values(cursor, """
+            INSERT INTO settings (key, value) VALUES %s
             ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value
-        """, (key, value))
+        """, list(data.get('settings', {}).items()), page_size=IMPORT_PAGE_SIZE)
 
-    # Import off days
-    for off_day in data.get('off_days', []):
-        cursor.execute("""
+        # Import off days (keyed by date so a repeated date keeps the last entry)
+        off_days = {od['date']: (od['date'], od['reason'], od.get('notes'))
+                    for od in data.get('off_days', [])}
+        execute_values(cursor, """
             INSERT INTO off_days (date, reason, notes)
-            VALUES (%s, %s, %s)
+            VALUES %s
             ON CONFLICT (date) DO UPDATE SET reason = EXCLUDED.reason, notes = EXCLUDED.notes
-        """, (off_day['date'], off_day['reason'], off_day.get('notes')))
+        """, list(off_days.values()), page_size=IMPORT_PAGE_SIZE)
 
-    # Import weight history
-    for entry in data.get('weight_history', []):
-        cursor.execute("""
+        # Import weight history
+        weights = {entry['recorded_at']: (entry['weight'], entry['recorded_at'], entry.get('notes'))
+                   for entry in data.get('weight_history', [])}
+        execute_values(cursor, """
             INSERT INTO weight_history (weight, recorded_at, notes)
-            VALUES (%s, %s, %s)
+            VALUES %s
             ON CONFLICT (recorded_at) DO UPDATE SET weight = EXCLUDED.weight, notes = EXCLUDED.notes
-        """, (entry['weight'], entry['recorded_at'], entry.get('notes')))
+        """, list(weights.values()), page_size=IMPORT_PAGE_SIZE)
 
-    conn.commit()
-    conn.close()
+        conn.commit()
 
 
 # ============== Multi-Ingredient Meal Operations ==============
@@ -740,148 +1105,141 @@ def create_multi_meal(name: str, meal_type: str, ingredients: List[dict],
     if logged_at is None:
         logged_at = datetime.now()
 
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    # Calculate totals from ingredients
-    total_calories = 0.0
-    total_protein = 0.0
-    total_carbs = 0.0
-    total_fats = 0.0
-
-    # Get food details and calculate nutrition for each ingredient
-    ingredient_details = []
-    for ing in ingredients:
-        cursor.execute("SELECT * FROM foods WHERE id = %s", (ing['food_id'],))
-        food = cursor.fetchone()
-        if food:
-            food = dict(food)
-            amount = ing['amount_grams']
-            # Calculate nutrition based on amount (foods are per 100g)
-            multiplier = amount / 100.0
-            cal = food['calories'] * multiplier
-            pro = food['protein'] * multiplier
-            carb = food['carbs'] * multiplier
-            fat = food['fats'] * multiplier
-
-            total_calories += cal
-            total_protein += pro
-            total_carbs += carb
-            total_fats += fat
-
-            ingredient_details.append({
-                'food_id': ing['food_id'],
-                'amount_grams': amount,
-                'calories': cal,
-                'protein': pro,
-                'carbs': carb,
-                'fats': fat
-            })
-
-    # Generate default name if not provided
-    if not name:
-        name = f"Meal at {logged_at.strftime('%I:%M %p')}"
-
-    # Insert the meal
-    cursor.execute("""
-        INSERT INTO meals (name, meal_type, logged_at, total_calories, total_protein,
-                          total_carbs, total_fats, notes)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        RETURNING id
-    """, (name, meal_type, logged_at, total_calories, total_protein,
-          total_carbs, total_fats, notes))
+    with connection() as conn:
+        cursor = conn.cursor()
 
-    meal_id = cursor.fetchone()['id']
+        # Generate default name if not provided
+        if not name:
+            name = f"Meal at {logged_at.strftime('%I:%M %p')}"
 
-    # Insert all ingredients
-    for ing in ingredient_details:
+        # One statement joins the ingredients to their foods, scales the nutrition
+        # (foods are per 100g), inserts the meal with the summed totals and then
+        # its ingredients. Ingredients whose food does not exist are skipped.
         cursor.execute("""
-            INSERT INTO meal_ingredients (meal_id, food_id, amount_grams,
-                                         calories, protein, carbs, fats)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """, (meal_id, ing['food_id'], ing['amount_grams'],
-              ing['calories'], ing['protein'], ing['carbs'], ing['fats']))
-
-    conn.commit()
-    conn.close()
+            WITH items AS (
+                SELECT g.ord, g.food_id, g.amount_grams,
+                       f.calories * g.amount_grams / 100.0 AS calories,
+                       f.protein * g.amount_grams / 100.0 AS protein,
+                       f.carbs * g.amount_grams / 100.0 AS carbs,
+                       f.fats * g.amount_grams / 100.0 AS fats
+                FROM unnest(%(food_ids)s::int[], %(amounts)s::float8[])
+                     WITH ORDINALITY AS g(food_id, amount_grams, ord)
+                JOIN foods f ON f.id = g.food_id
+            ), meal AS (
+                INSERT INTO meals (name, meal_type, logged_at, total_calories, total_protein,
+                                   total_carbs, total_fats, notes)
+                SELECT %(name)s, %(meal_type)s, %(logged_at)s,
+                       COALESCE(SUM(calories), 0), COALESCE(SUM(protein), 0),
+                       COALESCE(SUM(carbs), 0), COALESCE(SUM(fats), 0), %(notes)s
+                FROM items
+                RETURNING id
+            ), ingredients AS (
+                INSERT INTO meal_ingredients (meal_id, food_id, amount_grams,
+                                             calories, protein, carbs, fats)
+                SELECT meal.id, items.food_id, items.amount_grams,
+                       items.calories, items.protein, items.carbs, items.fats
+                FROM meal, items
+                ORDER BY items.ord
+            )
+            SELECT id FROM meal
+        """, {
+            'food_ids': [ing['food_id'] for ing in ingredients],
+            'amounts': [ing['amount_grams'] for ing in ingredients],
+            'name': name,
+            'meal_type': meal_type,
+            'logged_at': logged_at,
+            'notes': notes,
+        })
+        meal_id = cursor.fetchone()['id']
+
+        conn.commit()
     return meal_id
 
 
 def get_meal(meal_id: int) -> Optional[dict]:
     """Get a meal with all its ingredients."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with connection() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute("SELECT * FROM meals WHERE id = %s", (meal_id,))
-    meal = cursor.fetchone()
+        cursor.execute("SELECT * FROM meals WHERE id = %s", (meal_id,))
+        meal = cursor.fetchone()
 
-    if not meal:
-        conn.close()
-        return None
+        if not meal:
+            return None
 
-    meal = dict(meal)
-
-    # Get ingredients with food details
-    cursor.execute("""
-        SELECT
-            mi.*,
-            f.name as food_name,
-            f.serving_size
-        FROM meal_ingredients mi
-        JOIN foods f ON mi.food_id = f.id
-        WHERE mi.meal_id = %s
-    """, (meal_id,))
+        # Get ingredients with food details
+        cursor.execute("""
+            SELECT
+                mi.*,
+                f.name as food_name,
+                f.serving_size
+            FROM meal_ingredients mi
+            JOIN foods f ON mi.food_id = f.id
+            WHERE mi.meal_id = %s
+        """, (meal_id,))
 
-    meal['ingredients'] = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+        meal['ingredients'] = cursor.fetchall()
     return meal
 
 
 def delete_multi_meal(meal_id: int) -> bool:
     """Delete a meal and all its ingredients."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with connection() as conn:
+        cursor = conn.cursor()
 
-    # Delete ingredients first (or rely on CASCADE)
-    cursor.execute("DELETE FROM meal_ingredients WHERE meal_id = %s", (meal_id,))
-    cursor.execute("DELETE FROM meals WHERE id = %s", (meal_id,))
+        # meal_ingredients.meal_id is ON DELETE CASCADE, so the ingredients go too
+        cursor.execute("DELETE FROM meals WHERE id = %s", (meal_id,))
 
-    success = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
+        success = cursor.rowcount > 0
+        conn.commit()
     return success
 
 
-def get_multi_meals_for_date(target_date: date) -> List[dict]:
-    """Get all multi-ingredient meals for a specific date."""
-    conn = get_connection()
-    cursor = conn.cursor()
+def _fetch_multi_meals(cursor, start: date, end: date) -> List[dict]:
+    """Fetch meals logged in [start, end) with their ingredients on an open cursor.
 
+    Ingredients for all meals come back in one query and are grouped here.
+    """
     cursor.execute("""
-        SELECT * FROM meals
-        WHERE DATE(logged_at) = %s
+        SELECT *, logged_at::date::text as logged_date FROM meals
+        WHERE logged_at >= %s AND logged_at < %s
         ORDER BY logged_at ASC
-    """, (target_date,))
+    """, (start, end))
+    meals = cursor.fetchall()
+    if not meals:
+        return meals
 
-    meals = []
-    for row in cursor.fetchall():
-        meal = dict(row)
+    by_id = {}
+    for meal in meals:
+        meal['ingredients'] = []
+        by_id[meal['id']] = meal
 
-        # Get ingredients for this meal
-        cursor.execute("""
-            SELECT
-                mi.*,
-                f.name as food_name,
-                f.serving_size
-            FROM meal_ingredients mi
-            JOIN foods f ON mi.food_id = f.id
-            WHERE mi.meal_id = %s
-        """, (meal['id'],))
+    cursor.execute("""
+        SELECT
+            mi.*,
+            f.name as food_name,
+            f.serving_size
+        FROM meal_ingredients mi
+        JOIN foods f ON mi.food_id = f.id
+        WHERE mi.meal_id = ANY(%s)
+        ORDER BY mi.id
+    """, (list(by_id),))
+    for ing in cursor.fetchall():
+        by_id[ing['meal_id']]['ingredients'].append(ing)
+
+    return meals
+
+
+def _fetch_multi_meals_for_date(cursor, target_date: date) -> List[dict]:
+    """Run the multi-ingredient meals query for a date on an open cursor."""
+    return _fetch_multi_meals(cursor, *_day_range(target_date))
 
-        meal['ingredients'] = [dict(ing) for ing in cursor.fetchall()]
-        meals.append(meal)
 
-    conn.close()
+def get_multi_meals_for_date(target_date: date) -> List[dict]:
+    """Get all multi-ingredient meals for a specific date."""
+    with connection() as conn:
+        cursor = conn.cursor()
+        meals = _fetch_multi_meals_for_date(cursor, target_date)
     return meals
 
 
@@ -890,43 +1248,38 @@ def get_all_meals_for_date(target_date: date) -> dict:
     Get all meals for a date - both single-food logs and multi-ingredient meals.
     Returns a dict with 'single_logs' and 'multi_meals' keys.
     """
-    single_logs = get_meals_for_date(target_date)
-    multi_meals = get_multi_meals_for_date(target_date)
+    with connection() as conn:
+        cursor = conn.cursor()
+        all_meals = {
+            'single_logs': _fetch_meals_for_date(cursor, target_date),
+            'multi_meals': _fetch_multi_meals_for_date(cursor, target_date)
+        }
+    return all_meals
+
 
-    return {
-        'single_logs': single_logs,
-        'multi_meals': multi_meals
-    }
+def get_daily_bundle(target_date: date) -> dict:
+    """
+    Get everything the daily dashboard needs over a single connection.
+    Returns a dict with 'totals', 'settings', 'single_logs', 'multi_meals'
+    and 'off_day' keys.
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+        bundle = {
+            'totals': _fetch_daily_totals(cursor, target_date),
+            'settings': _fetch_all_settings(cursor),
+            'single_logs': _fetch_meals_for_date(cursor, target_date),
+            'multi_meals': _fetch_multi_meals_for_date(cursor, target_date),
+            'off_day': _fetch_off_day(cursor, target_date),
+        }
+    return bundle
 
 
 def get_multi_meals_for_date_range(start_date: date, end_date: date) -> List[dict]:
     """Get all multi-ingredient meals in a date range."""
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT * FROM meals
-        WHERE DATE(logged_at) BETWEEN %s AND %s
-        ORDER BY logged_at ASC
-    """, (start_date, end_date))
-
-    meals = []
-    for row in cursor.fetchall():
-        meal = dict(row)
-
-        cursor.execute("""
-            SELECT
-                mi.*,
-                f.name as food_name
-            FROM meal_ingredients mi
-            JOIN foods f ON mi.food_id = f.id
-            WHERE mi.meal_id = %s
-        """, (meal['id'],))
-
-        meal['ingredients'] = [dict(ing) for ing in cursor.fetchall()]
-        meals.append(meal)
-
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        meals = _fetch_multi_meals(cursor, *_day_range(start_date, end_date))
     return meals
 
 
@@ -941,44 +1294,39 @@ def import_foods_bulk(foods_data: List[dict], skip_duplicates: bool = True) -> d
 
     Returns dict with 'added', 'skipped', 'updated' counts.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    added = 0
-    skipped = 0
-    updated = 0
-
-    for food in foods_data:
-        name = food['name']
-        calories = food.get('calories', 0)
-        protein = food.get('protein', 0)
-        carbs = food.get('carbs', 0)
-        fats = food.get('fats', 0)
-        serving_size = food.get('serving_size', '100g')
-
-        # Check if food exists
-        cursor.execute("SELECT id FROM foods WHERE name = %s", (name,))
-        existing = cursor.fetchone()
-
-        if existing:
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SET LOCAL synchronous_commit TO OFF")
+
+        # One row per name: the first entry wins when skipping, the last when updating
+        rows = {}
+        for food in foods_data:
+            row = (food['name'], food.get('calories', 0), food.get('protein', 0),
+                   food.get('carbs', 0), food.get('fats', 0), food.get('serving_size', '100g'))
             if skip_duplicates:
-                skipped += 1
+                rows.setdefault(food['name'], row)
             else:
-                # Update existing food
-                cursor.execute("""
-                    UPDATE foods
-                    SET calories = %s, protein = %s, carbs = %s, fats = %s, serving_size = %s
-                    WHERE name = %s
-                """, (calories, protein, carbs, fats, serving_size, name))
-                updated += 1
+                rows[food['name']] = row
+
+        if skip_duplicates:
+            conflict = "DO NOTHING"
         else:
-            cursor.execute("""
-                INSERT INTO foods (name, calories, protein, carbs, fats, serving_size)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (name, calories, protein, carbs, fats, serving_size))
-            added += 1
+            conflict = """DO UPDATE SET calories = EXCLUDED.calories, protein = EXCLUDED.protein,
+                          carbs = EXCLUDED.carbs, fats = EXCLUDED.fats,
+                          serving_size = EXCLUDED.serving_size"""
+
+        # xmax is 0 only for freshly inserted rows, which tells inserts from updates
+        results = execute_values(cursor, f"""
+            INSERT INTO foods (name, calories, protein, carbs, fats, serving_size)
+            VALUES %s
+            ON CONFLICT (name) {conflict}
+            RETURNING (xmax = 0) AS inserted
+        """, list(rows.values()), page_size=IMPORT_PAGE_SIZE, fetch=True)
+
+        added = sum(1 for row in results if row['inserted'])
+        skipped = len(foods_data) - added if skip_duplicates else 0
+        updated = 0 if skip_duplicates else len(foods_data) - added
 
-    conn.commit()
-    conn.close()
+        conn.commit()
 
     return {'added': added, 'skipped': skipped, 'updated': updated}
@@ -92,6 +92,11 @@ FOODS_DATA = [
     ("Five Guys", 610, 18, 39, 32),
 ]
 
+FOOD_KEYS = ('name', 'calories', 'protein', 'carbs', 'fats', 'serving_size')
+
+# Built once at import time in the shape import_foods_bulk expects
+FOODS_LIST = [dict(zip(FOOD_KEYS, (*food, '100g'))) for food in FOODS_DATA]
+
 
 def import_foods():
     """Import all foods into the database."""
@@ -101,22 +106,10 @@ def import_foods():
     # Initialize database first
     db.init_database()
 
-    # Convert to dict format
-    foods_list = []
-    for name, calories, protein, carbs, fats in FOODS_DATA:
-        foods_list.append({
-            'name': name,
-            'calories': calories,
-            'protein': protein,
-            'carbs': carbs,
-            'fats': fats,
-            'serving_size': '100g'
-        })
-
-    print(f"Importing {len(foods_list)} foods...")
+    print(f"Importing {len(FOODS_LIST)} foods...")
 
     # Import with skip_duplicates=True to avoid errors on re-run
-    result = db.import_foods_bulk(foods_list, skip_duplicates=True)
+    result = db.import_foods_bulk(FOODS_LIST, skip_duplicates=True)
 
     print(f"\nResults:")
     print(f"  Added:   {result['added']}")
@@ -3,15 +3,16 @@ Business logic module for Food Tracker CLI.
 Handles calculations, goal management, and analytics.
 """
 
-from datetime import date, datetime, timedelta
+from calendar import monthrange
+from datetime import date, timedelta
 from typing import Dict, List, Optional, Tuple
 from collections import defaultdict
 
 from database import (
-    get_meals_for_date, get_meals_for_date_range,
-    get_off_days_in_range, is_off_day, get_setting, set_setting,
+    get_meals_for_date,
+    get_off_days_map, is_off_day, get_setting, set_setting,
     get_all_settings, get_weight_history, get_latest_weight,
-    get_multi_meals_for_date_range
+    get_daily_nutrition_totals, get_logged_dates
 )
 
 
@@ -40,6 +41,8 @@ GOAL_TYPES = {
 
 MEAL_TYPES = ['breakfast', 'lunch', 'dinner', 'snack']
 
+MACRO_KEYS = ('calories', 'protein', 'carbs', 'fats')
+
 
 def get_current_goal() -> str:
     """Get the current goal type."""
@@ -58,19 +61,23 @@ def get_goal_info(goal_type: str = None) -> dict:
     """Get information about a goal type."""
     if goal_type is None:
         goal_type = get_current_goal()
-    return GOAL_TYPES.get(goal_type.lower(), GOAL_TYPES['maintenance'])
+    # Stored goal types are already lowercase, so try the exact key first
+    info = GOAL_TYPES.get(goal_type)
+    if info is None:
+        info = GOAL_TYPES.get(goal_type.lower(), GOAL_TYPES['maintenance'])
+    return info
 
 
 def calculate_recommended_calories(base_maintenance: int = 2000) -> int:
     """Calculate recommended daily calories based on current goal."""
     goal_type = get_current_goal()
-    goal_info = get_goal_info(goal_type)
-    return base_maintenance + goal_info['calorie_modifier']
+    return base_maintenance + get_goal_info(goal_type)['calorie_modifier']
 
 
-def get_daily_targets() -> dict:
-    """Get current daily targets from settings."""
-    settings = get_all_settings()
+def get_daily_targets(settings: dict = None) -> dict:
+    """Get current daily targets from settings (fetched if not given)."""
+    if settings is None:
+        settings = get_all_settings()
     return {
         'calories': int(settings.get('daily_calorie_target', 2000)),
         'protein': int(settings.get('protein_target', 150)),
@@ -120,37 +127,35 @@ def calculate_daily_totals(target_date: date = None) -> dict:
     return totals
 
 
-def calculate_daily_progress(target_date: date = None) -> dict:
-    """Calculate progress toward daily goals."""
+def calculate_daily_progress(target_date: date = None, settings: dict = None) -> dict:
+    """Calculate progress toward daily goals (settings fetched if not given)."""
     if target_date is None:
         target_date = date.today()
 
     totals = calculate_daily_totals(target_date)
-    targets = get_daily_targets()
+    targets = get_daily_targets(settings)
+    return build_progress(totals, targets)
+
+
+def build_progress(totals: dict, targets: dict) -> dict:
+    """Build the progress dict (remaining, percentage, surplus) from totals and targets."""
+    remaining = {}
+    percentage = {}
+    for key in MACRO_KEYS:
+        total = totals[key]
+        target = targets[key]
+        remaining[key] = target - total
+        percentage[key] = (total / target * 100) if target > 0 else 0
 
-    progress = {
+    return {
         'totals': totals,
         'targets': targets,
-        'remaining': {
-            'calories': targets['calories'] - totals['calories'],
-            'protein': targets['protein'] - totals['protein'],
-            'carbs': targets['carbs'] - totals['carbs'],
-            'fats': targets['fats'] - totals['fats'],
-        },
-        'percentage': {
-            'calories': (totals['calories'] / targets['calories'] * 100) if targets['calories'] > 0 else 0,
-            'protein': (totals['protein'] / targets['protein'] * 100) if targets['protein'] > 0 else 0,
-            'carbs': (totals['carbs'] / targets['carbs'] * 100) if targets['carbs'] > 0 else 0,
-            'fats': (totals['fats'] / targets['fats'] * 100) if targets['fats'] > 0 else 0,
-        },
+        'remaining': remaining,
+        'percentage': percentage,
         'is_off_day': totals['is_off_day'],
+        'deficit_surplus': totals['calories'] - targets['calories'],
     }
 
-    # Calculate surplus/deficit
-    progress['deficit_surplus'] = totals['calories'] - targets['calories']
-
-    return progress
-
 
 def get_meals_by_type(target_date: date = None) -> dict:
     """Get meals organized by meal type for a date."""
@@ -190,123 +195,53 @@ def calculate_weekly_averages(week_start: date = None) -> dict:
     """
     if week_start is None:
         week_start = get_week_start()
-
     week_end = week_start + timedelta(days=6)
-    meals = get_meals_for_date_range(week_start, week_end)
-    multi_meals = get_multi_meals_for_date_range(week_start, week_end)
-    off_days = get_off_days_in_range(week_start, week_end)
-
-    # Debug: log raw data
-    debug_raw_meals = []
-    debug_raw_multi = []
-
-    # Helper to get date string from logged_at field (handles datetime, date, and string)
-    def get_date_str(logged_at):
-        if isinstance(logged_at, datetime):
-            return logged_at.date().isoformat()
-        elif isinstance(logged_at, date):
-            return logged_at.isoformat()
-        elif logged_at is None:
-            return None
-        else:
-            # Handle string format - could be "2026-01-19" or "2026-01-19 12:30:00" or ISO format
-            logged_str = str(logged_at)
-            # Extract just the date part (first 10 characters)
-            return logged_str[:10]
-
-    # Group meals by date
-    daily_totals = defaultdict(lambda: {
-        'calories': 0.0, 'protein': 0.0, 'carbs': 0.0, 'fats': 0.0
-    })
-
-    # Add single-food meals
-    for meal in meals:
-        meal_date = get_date_str(meal['logged_at'])
-        if meal_date is None:
-            continue
-        portions = meal['portions']
-        cal_contribution = meal['calories'] * portions
-        daily_totals[meal_date]['calories'] += cal_contribution
-        daily_totals[meal_date]['protein'] += meal['protein'] * portions
-        daily_totals[meal_date]['carbs'] += meal['carbs'] * portions
-        daily_totals[meal_date]['fats'] += meal['fats'] * portions
-        debug_raw_meals.append({
-            'date': meal_date,
-            'name': meal.get('name', '?'),
-            'raw_logged_at': str(meal['logged_at']),
-            'logged_at_type': type(meal['logged_at']).__name__,
-            'calories': meal['calories'],
-            'portions': portions,
-            'contribution': cal_contribution
-        })
 
-    # Add multi-ingredient meals
-    for meal in multi_meals:
-        meal_date = get_date_str(meal['logged_at'])
-        if meal_date is None:
-            continue
-        daily_totals[meal_date]['calories'] += meal['total_calories']
-        daily_totals[meal_date]['protein'] += meal['total_protein']
-        daily_totals[meal_date]['carbs'] += meal['total_carbs']
-        daily_totals[meal_date]['fats'] += meal['total_fats']
-        debug_raw_multi.append({
-            'date': meal_date,
-            'name': meal.get('name', '?'),
-            'raw_logged_at': str(meal['logged_at']),
-            'logged_at_type': type(meal['logged_at']).__name__,
-            'total_calories': meal['total_calories']
-        })
+    # Per-day totals are summed by the database
+    daily_totals = get_daily_nutrition_totals(week_start, week_end)
+    off_days_by_date = get_off_days_map(week_start, week_end)
 
-    # Convert off_day dates to strings for comparison
-    off_day_dates = set()
-    debug_off_day_raw = []
-    for od in off_days:
-        od_date = od['date']
-        if isinstance(od_date, date):
-            date_str = od_date.isoformat()
-        else:
-            # Handle string - take first 10 chars for YYYY-MM-DD
-            date_str = str(od_date)[:10]
-        off_day_dates.add(date_str)
-        debug_off_day_raw.append({
-            'raw': str(od_date),
-            'type': type(od_date).__name__,
-            'normalized': date_str
-        })
+    return {
+        'week_start': week_start,
+        'week_end': week_end,
+        **summarize_days(daily_totals, off_days_by_date),
+        'daily_breakdown': daily_totals,
+    }
+
+
+def get_month_end(month_start: date) -> date:
+    """Get the last day of the month starting at month_start."""
+    return month_start.replace(day=monthrange(month_start.year, month_start.month)[1])
+
+
+def _days_between(by_date: dict, start: date, end: date) -> dict:
+    """Slice a dict keyed by ISO date string down to [start, end]."""
+    start_str, end_str = start.isoformat(), end.isoformat()
+    return {day: value for day, value in by_date.items() if start_str <= day <= end_str}
+
+
+def summarize_days(daily_totals: dict, off_days_by_date: dict) -> dict:
+    """Average per-day totals over the tracked days.
+
+    Only counts days that have at least one meal logged.
+    Excludes off days from the average calculation.
+    """
+    # Off days are keyed by ISO date string, matching the daily_totals keys
+    off_day_dates = off_days_by_date.keys()
 
     # Only count days that have actual meal data and are not off days
-    tracked_days = 0
-    total_calories = 0.0
-    total_protein = 0.0
-    total_carbs = 0.0
-    total_fats = 0.0
-
-    for date_str, totals in daily_totals.items():
-        # Skip off days
-        if date_str in off_day_dates:
-            continue
-        # Only count days with actual data
-        tracked_days += 1
-        total_calories += totals['calories']
-        total_protein += totals['protein']
-        total_carbs += totals['carbs']
-        total_fats += totals['fats']
-
-    # Debug: show which days are being counted
-    days_counted = []
-    days_excluded = []
-    for date_str, totals in daily_totals.items():
-        if date_str in off_day_dates:
-            days_excluded.append({'date': date_str, 'reason': 'off_day', 'calories': totals['calories']})
-        else:
-            days_counted.append({'date': date_str, 'calories': totals['calories']})
+    tracked = [totals for date_str, totals in daily_totals.items()
+               if date_str not in off_day_dates]
+    tracked_days = len(tracked)
+    total_calories = sum((totals['calories'] for totals in tracked), 0.0)
+    total_protein = sum((totals['protein'] for totals in tracked), 0.0)
+    total_carbs = sum((totals['carbs'] for totals in tracked), 0.0)
+    total_fats = sum((totals['fats'] for totals in tracked), 0.0)
 
     return {
-        'week_start': week_start,
-        'week_end': week_end,
         'tracked_days': tracked_days,
-        'off_day_count': len(off_days),
-        'off_days': off_days,
+        'off_day_count': len(off_days_by_date),
+        'off_days': list(off_days_by_date.values()),
         'totals': {
             'calories': total_calories,
             'protein': total_protein,
@@ -319,23 +254,6 @@ def calculate_weekly_averages(week_start: date = None) -> dict:
             'carbs': total_carbs / tracked_days if tracked_days > 0 else 0,
             'fats': total_fats / tracked_days if tracked_days > 0 else 0,
         },
-        'daily_breakdown': dict(daily_totals),
-        'debug': {
-            'days_counted': days_counted,
-            'days_excluded': days_excluded,
-            'off_day_dates_set': list(off_day_dates),
-            'off_day_raw': debug_off_day_raw,
-            'single_meals_count': len(meals),
-            'multi_meals_count': len(multi_meals),
-            'raw_single_meals': debug_raw_meals,
-            'raw_multi_meals': debug_raw_multi,
-            'calculation_check': {
-                'total_calories': total_calories,
-                'tracked_days': tracked_days,
-                'expected_average': total_calories / tracked_days if tracked_days > 0 else 0,
-                'all_daily_totals_keys': list(daily_totals.keys()),
-            }
-        }
     }
 
 
@@ -347,149 +265,95 @@ def calculate_monthly_averages(month_start: date = None) -> dict:
     """
     if month_start is None:
         month_start = get_month_start()
+    month_end = get_month_end(month_start)
 
-    # Get end of month
-    if month_start.month == 12:
-        next_month = month_start.replace(year=month_start.year + 1, month=1)
-    else:
-        next_month = month_start.replace(month=month_start.month + 1)
-    month_end = next_month - timedelta(days=1)
-
-    meals = get_meals_for_date_range(month_start, month_end)
-    multi_meals = get_multi_meals_for_date_range(month_start, month_end)
-    off_days = get_off_days_in_range(month_start, month_end)
-
-    # Helper to get date string from logged_at field (handles datetime, date, and string)
-    def get_date_str(logged_at):
-        if isinstance(logged_at, datetime):
-            return logged_at.date().isoformat()
-        elif isinstance(logged_at, date):
-            return logged_at.isoformat()
-        elif logged_at is None:
-            return None
-        else:
-            # Handle string format - extract just the date part
-            return str(logged_at)[:10]
-
-    # Group meals by date
-    daily_totals = defaultdict(lambda: {
-        'calories': 0.0, 'protein': 0.0, 'carbs': 0.0, 'fats': 0.0
-    })
-
-    # Add single-food meals
-    for meal in meals:
-        meal_date = get_date_str(meal['logged_at'])
-        if meal_date is None:
-            continue
-        portions = meal['portions']
-        daily_totals[meal_date]['calories'] += meal['calories'] * portions
-        daily_totals[meal_date]['protein'] += meal['protein'] * portions
-        daily_totals[meal_date]['carbs'] += meal['carbs'] * portions
-        daily_totals[meal_date]['fats'] += meal['fats'] * portions
-
-    # Add multi-ingredient meals
-    for meal in multi_meals:
-        meal_date = get_date_str(meal['logged_at'])
-        if meal_date is None:
-            continue
-        daily_totals[meal_date]['calories'] += meal['total_calories']
-        daily_totals[meal_date]['protein'] += meal['total_protein']
-        daily_totals[meal_date]['carbs'] += meal['total_carbs']
-        daily_totals[meal_date]['fats'] += meal['total_fats']
-
-    # Convert off_day dates to strings for comparison
-    off_day_dates = set()
-    for od in off_days:
-        od_date = od['date']
-        if isinstance(od_date, date):
-            date_str = od_date.isoformat()
-        else:
-            # Handle string - take first 10 chars for YYYY-MM-DD
-            date_str = str(od_date)[:10]
-        off_day_dates.add(date_str)
-
-    # Only count days that have actual meal data and are not off days
-    tracked_days = 0
-    total_calories = 0.0
-    total_protein = 0.0
-    total_carbs = 0.0
-    total_fats = 0.0
-
-    for date_str, totals in daily_totals.items():
-        # Skip off days
-        if date_str in off_day_dates:
-            continue
-        # Only count days with actual data
-        tracked_days += 1
-        total_calories += totals['calories']
-        total_protein += totals['protein']
-        total_carbs += totals['carbs']
-        total_fats += totals['fats']
+    # Per-day totals are summed by the database
+    daily_totals = get_daily_nutrition_totals(month_start, month_end)
+    off_days_by_date = get_off_days_map(month_start, month_end)
 
     return {
         'month_start': month_start,
         'month_end': month_end,
         'month_name': month_start.strftime('%B %Y'),
-        'tracked_days': tracked_days,
-        'off_day_count': len(off_days),
-        'off_days': off_days,
-        'totals': {
-            'calories': total_calories,
-            'protein': total_protein,
-            'carbs': total_carbs,
-            'fats': total_fats,
-        },
-        'averages': {
-            'calories': total_calories / tracked_days if tracked_days > 0 else 0,
-            'protein': total_protein / tracked_days if tracked_days > 0 else 0,
-            'carbs': total_carbs / tracked_days if tracked_days > 0 else 0,
-            'fats': total_fats / tracked_days if tracked_days > 0 else 0,
-        },
+        **summarize_days(daily_totals, off_days_by_date),
     }
 
 
 def get_weekly_breakdown(num_weeks: int = 4) -> List[dict]:
-    """Get week-by-week breakdown for the dashboard."""
-    weeks = []
+    """Get week-by-week breakdown for the dashboard.
+
+    The whole window is fetched in two queries and split per week here.
+    """
+    if num_weeks <= 0:
+        return []
+
     current_week_start = get_week_start()
+    window_start = current_week_start - timedelta(weeks=num_weeks - 1)
+    window_end = current_week_start + timedelta(days=6)
+    daily_totals = get_daily_nutrition_totals(window_start, window_end)
+    off_days_by_date = get_off_days_map(window_start, window_end)
 
+    weeks = []
     for i in range(num_weeks):
         week_start = current_week_start - timedelta(weeks=i)
-        week_data = calculate_weekly_averages(week_start)
-        weeks.append(week_data)
+        week_end = week_start + timedelta(days=6)
+        week_totals = _days_between(daily_totals, week_start, week_end)
+        weeks.append({
+            'week_start': week_start,
+            'week_end': week_end,
+            **summarize_days(week_totals, _days_between(off_days_by_date, week_start, week_end)),
+            'daily_breakdown': week_totals,
+        })
 
     return weeks
 
 
 def get_monthly_breakdown(num_months: int = 3) -> List[dict]:
-    """Get month-by-month breakdown for the dashboard."""
-    months = []
-    current_month = get_month_start()
+    """Get month-by-month breakdown for the dashboard.
 
+    The whole window is fetched in two queries and split per month here.
+    """
+    if num_months <= 0:
+        return []
+
+    current_month = get_month_start()
+    # Count months from year 0 so going back i months is a plain subtraction
+    month_index = current_month.year * 12 + current_month.month - 1
+    month_starts = []
     for i in range(num_months):
-        if i == 0:
-            month_start = current_month
-        else:
-            # Go back i months
-            year = current_month.year
-            month = current_month.month - i
-            while month <= 0:
-                month += 12
-                year -= 1
-            month_start = date(year, month, 1)
-
-        month_data = calculate_monthly_averages(month_start)
-        months.append(month_data)
+        year, month = divmod(month_index - i, 12)
+        month_starts.append(date(year, month + 1, 1))
+
+    window_end = get_month_end(current_month)
+    daily_totals = get_daily_nutrition_totals(month_starts[-1], window_end)
+    off_days_by_date = get_off_days_map(month_starts[-1], window_end)
+
+    months = []
+    for month_start in month_starts:
+        month_end = get_month_end(month_start)
+        months.append({
+            'month_start': month_start,
+            'month_end': month_end,
+            'month_name': month_start.strftime('%B %Y'),
+            **summarize_days(_days_between(daily_totals, month_start, month_end),
+                             _days_between(off_days_by_date, month_start, month_end)),
+        })
 
     return months
 
 
 # ============== Weight Progress ==============
 
+WEIGHT_PROGRESS_ENTRIES = 30
+
+
 def calculate_weight_progress() -> dict:
     """Calculate weight change progress."""
-    history = get_weight_history(limit=30)
+    return build_weight_progress(get_weight_history(limit=WEIGHT_PROGRESS_ENTRIES))
+
 
+def build_weight_progress(history: list) -> dict:
+    """Build weight progress from entries ordered newest first."""
     if not history:
         return {
             'current_weight': None,
@@ -502,10 +366,9 @@ def calculate_weight_progress() -> dict:
     starting = history[-1]['weight'] if len(history) > 1 else current
     change = current - starting
 
-    # Calculate 7-day trend
-    recent = [h['weight'] for h in history[:7]]
-    if len(recent) >= 2:
-        trend = recent[0] - recent[-1]
+    # Calculate 7-day trend: newest entry against the 7th newest (or oldest)
+    if len(history) >= 2:
+        trend = current - history[min(6, len(history) - 1)]['weight']
     else:
         trend = 0
 
@@ -521,24 +384,32 @@ def calculate_weight_progress() -> dict:
 
 # ============== Utility Functions ==============
 
+# Days of history fetched per round trip while counting the streak
+STREAK_WINDOW_DAYS = 90
+
+
 def get_streak() -> int:
     """Calculate current tracking streak (consecutive days logged)."""
     streak = 0
     current = date.today()
 
+    # Walk back one window at a time, two queries per window
     while True:
-        if is_off_day(current):
-            current -= timedelta(days=1)
-            continue
-
-        meals = get_meals_for_date(current)
-        if meals:
-            streak += 1
-            current -= timedelta(days=1)
-        else:
-            break
-
-    return streak
+        window_start = current - timedelta(days=STREAK_WINDOW_DAYS - 1)
+        logged_dates = get_logged_dates(window_start, current)
+        off_day_dates = get_off_days_map(window_start, current).keys()
+
+        while current >= window_start:
+            current_str = current.isoformat()
+            if current_str in off_day_dates:
+                current -= timedelta(days=1)
+                continue
+
+            if current_str in logged_dates:
+                streak += 1
+                current -= timedelta(days=1)
+            else:
+                return streak
 
 
 def format_macro_ratio(protein: float, carbs: float, fats: float) -> str: